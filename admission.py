@@ -0,0 +1,206 @@
+#!/usr/bin/env python3
+"""
+Admission control and weighted fair scheduling for processing requests
+
+Each request belongs to a flow (priority class, tenant). Requests wait in a
+single queue ordered by weighted-fair-queuing finish tags, so interactive
+uploads are dispatched ahead of bulk ones without starving them, and no
+single tenant can monopolise the worker slots. Once the backlog limit is
+reached new requests are rejected with a Retry-After estimate instead of
+queueing without bound.
+"""
+
+import heapq
+import itertools
+import math
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+DEFAULT_WEIGHTS = {'interactive': 8, 'bulk': 1}
+# Known upload sources and the priority class each may use; every other
+# source shares one bulk tenant
+DEFAULT_SOURCES = {'web_ui': 'interactive'}
+UNKNOWN_TENANT = 'other'
+
+
+class Overloaded(Exception):
+    """Raised when a request cannot be admitted; carries a Retry-After hint"""
+
+    def __init__(self, message, retry_after):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class AdmissionController:
+    """Bounded, weighted-fair admission for a pool of worker slots
+
+    max_in_flight  requests allowed to run at once
+    max_backlog    running plus waiting requests before rejecting with 429
+    max_wait       seconds a request may wait for a slot before rejection
+    max_pipeline   documents handed to the pipeline but not yet finished;
+                   0 disables pipeline tracking
+    pipeline_ttl   seconds after which an unfinished pipeline entry is
+                   assumed done, so lost completions cannot leak capacity
+    sources        allow-list of upload source -> highest priority class
+    """
+
+    def __init__(self, max_in_flight=8, max_backlog=64, max_wait=30.0,
+                 weights=None, max_pipeline=0, pipeline_ttl=900.0, sources=None):
+        self.max_in_flight = max_in_flight
+        self.max_backlog = max_backlog
+        self.max_wait = max_wait
+        self.weights = dict(weights or DEFAULT_WEIGHTS)
+        self.max_pipeline = max_pipeline
+        self.pipeline_ttl = pipeline_ttl
+        self.sources = dict(DEFAULT_SOURCES if sources is None else sources)
+
+        self._cond = threading.Condition()
+        self._queue = []  # heap of (finish_tag, seq, token)
+        self._seq = itertools.count()
+        self._virtual_time = 0.0
+        self._last_finish = {}  # flow -> last finish tag
+        self._in_flight = {}  # tenant -> running requests
+        self._running = 0
+        self._pipeline = {}  # document_id -> (tenant, started_at)
+        self._service_time = 1.0  # EWMA of seconds per request
+
+    @classmethod
+    def from_env(cls):
+        return cls(
+            max_in_flight=int(os.environ.get('ADMISSION_MAX_IN_FLIGHT', 8)),
+            max_backlog=int(os.environ.get('ADMISSION_MAX_BACKLOG', 64)),
+            max_wait=float(os.environ.get('ADMISSION_MAX_WAIT', 30)),
+            weights={
+                'interactive': float(os.environ.get('ADMISSION_WEIGHT_INTERACTIVE', 8)),
+                'bulk': float(os.environ.get('ADMISSION_WEIGHT_BULK', 1))
+            },
+            max_pipeline=int(os.environ.get('ADMISSION_MAX_PIPELINE', 0)),
+            pipeline_ttl=float(os.environ.get('ADMISSION_PIPELINE_TTL', 900)),
+            sources=parse_sources(os.environ.get('ADMISSION_SOURCES'))
+        )
+
+    def classify(self, source, requested=None):
+        """Map a client-supplied source and priority onto a (tenant, priority) flow
+
+        Only allow-listed sources get their own tenant and may ask for their
+        priority class; a source can always lower itself to a class with a
+        smaller weight. Unknown sources share one bulk tenant, so inventing
+        source names gains neither priority nor extra fair share.
+        """
+        allowed = self.sources.get(source)
+        if allowed not in self.weights:
+            return UNKNOWN_TENANT, 'bulk'
+        if requested in self.weights and self.weights[requested] <= self.weights[allowed]:
+            return source, requested
+        return source, allowed
+
+    def retry_after(self):
+        """Seconds until the current backlog is expected to drain a slot"""
+        backlog = self._running + len(self._queue)
+        return max(1, math.ceil(backlog * self._service_time / max(self.max_in_flight, 1)))
+
+    def _expire_pipeline(self, now):
+        expired = [d for d, (_, started) in self._pipeline.items() if now - started > self.pipeline_ttl]
+        for document_id in expired:
+            del self._pipeline[document_id]
+
+    def _reject(self, message):
+        raise Overloaded(message, self.retry_after())
+
+    @contextmanager
+    def admit(self, tenant, priority='bulk', cost=1.0):
+        """Hold a worker slot for the duration of the with-block
+
+        tenant and priority should come from classify(). Raises Overloaded
+        when the backlog is full or the wait exceeds max_wait.
+        """
+        if priority not in self.weights:
+            priority = 'bulk'
+        flow = (priority, tenant)
+
+        with self._cond:
+            now = time.monotonic()
+            if self.max_pipeline:
+                self._expire_pipeline(now)
+                if len(self._pipeline) >= self.max_pipeline:
+                    self._reject('Processing pipeline is at capacity')
+            if self._running + len(self._queue) >= self.max_backlog:
+                self._reject('Too many requests queued')
+
+            start = max(self._virtual_time, self._last_finish.get(flow, 0.0))
+            finish = start + cost / self.weights[priority]
+            self._last_finish[flow] = finish
+            entry = (finish, next(self._seq), object())
+            heapq.heappush(self._queue, entry)
+
+            deadline = now + self.max_wait
+            while not (self._queue[0] is entry and self._running < self.max_in_flight):
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self._queue.remove(entry)
+                    heapq.heapify(self._queue)
+                    self._cond.notify_all()
+                    self._reject('Timed out waiting for a processing slot')
+                self._cond.wait(remaining)
+
+            heapq.heappop(self._queue)
+            self._virtual_time = finish
+            # A flow whose last finish tag is behind virtual time restarts
+            # from virtual time anyway, so its entry can go
+            self._last_finish = {f: t for f, t in self._last_finish.items() if t > finish}
+            self._running += 1
+            self._in_flight[tenant] = self._in_flight.get(tenant, 0) + 1
+            self._cond.notify_all()
+
+        started = time.monotonic()
+        try:
+            yield
+        finally:
+            elapsed = time.monotonic() - started
+            with self._cond:
+                self._running -= 1
+                self._in_flight[tenant] -= 1
+                if not self._in_flight[tenant]:
+                    del self._in_flight[tenant]
+                self._service_time = 0.8 * self._service_time + 0.2 * elapsed
+                self._cond.notify_all()
+
+    def pipeline_started(self, document_id, tenant):
+        """Record a document handed to the asynchronous pipeline"""
+        if self.max_pipeline:
+            with self._cond:
+                self._pipeline[document_id] = (tenant, time.monotonic())
+
+    def pipeline_finished(self, document_id):
+        """Release pipeline capacity once a document reaches a final state"""
+        with self._cond:
+            self._pipeline.pop(document_id, None)
+
+    def stats(self):
+        with self._cond:
+            pipeline = {}
+            for tenant, _ in self._pipeline.values():
+                pipeline[tenant] = pipeline.get(tenant, 0) + 1
+            return {
+                'running': self._running,
+                'queued': len(self._queue),
+                'in_flight_by_tenant': dict(self._in_flight),
+                'pipeline_by_tenant': pipeline,
+                'max_in_flight': self.max_in_flight,
+                'max_backlog': self.max_backlog,
+                'retry_after': self.retry_after()
+            }
+
+
+def parse_sources(value):
+    """Parse ADMISSION_SOURCES, e.g. 'web_ui=interactive,nightly_import=bulk'"""
+    if not value:
+        return None
+    sources = {}
+    for item in value.split(','):
+        source, _, priority = item.partition('=')
+        if source.strip():
+            sources[source.strip()] = priority.strip() or 'bulk'
+    return sources
@@ -3,37 +3,58 @@
 Simple Flask web UI for testing AWS IDP system
 """
 
-from flask import Flask, render_template, request, jsonify, redirect, url_for
-import boto3
+from flask import Flask, Response, render_template, request, jsonify, redirect, url_for, stream_with_context
+import itertools
 import json
 import uuid
 import time
 from datetime import datetime
 import os
 from werkzeug.utils import secure_filename
+from admission import AdmissionController, Overloaded
+from export import decode_cursor, iter_arrow_stream, iter_jsonl, iter_records, require_pyarrow
+from settings import settings
+from spool import SpoolFull, UploadSpool
+from static_assets import StaticAssets
 
 app = Flask(__name__)
 app.config['MAX_CONTENT_LENGTH'] = 16 * 1024 * 1024  # 16MB max file size
+assets = StaticAssets(app)
+index_page = assets.page('index.html')
+admission = AdmissionController.from_env()
 
-# AWS Configuration
-AWS_REGION = os.environ.get('AWS_REGION', 'us-east-1')
-ENVIRONMENT = os.environ.get('ENVIRONMENT', 'dev')
-ACCOUNT_ID = boto3.client('sts').get_caller_identity()['Account']
+# AWS configuration and clients are resolved lazily on first use (settings.py),
+# so importing the app makes no network calls and works offline
 
-# AWS Resources
-RAW_BUCKET = f'aws-idp-system-documents-raw-{ACCOUNT_ID}-{ENVIRONMENT}'
-STATE_MACHINE_ARN = f'arn:aws:states:{AWS_REGION}:{ACCOUNT_ID}:stateMachine:aws-idp-system-document-processing-{ENVIRONMENT}'
-METADATA_TABLE = f'aws-idp-system-document-metadata-{ENVIRONMENT}'
+def start_processing(document_id, source_key):
+    """Start the Step Functions execution for an uploaded document"""
+    stepfunctions_client = settings.client('stepfunctions')
+    execution_input = {
+        'document_id': document_id,
+        'source_bucket': settings.raw_bucket,
+        'source_key': source_key
+    }
+    
+    try:
+        response = stepfunctions_client.start_execution(
+            stateMachineArn=settings.state_machine_arn,
+            name=f"web-execution-{document_id}",
+            input=json.dumps(execution_input)
+        )
+        return response['executionArn']
+    except stepfunctions_client.exceptions.ExecutionAlreadyExists:
+        # Retried from the upload spool after an earlier attempt got through
+        return None
 
-# Initialize AWS clients
-s3_client = boto3.client('s3', region_name=AWS_REGION)
-stepfunctions_client = boto3.client('stepfunctions', region_name=AWS_REGION)
-dynamodb = boto3.resource('dynamodb', region_name=AWS_REGION)
+# Optional write-ahead spool (UPLOAD_SPOOL_DIR) decouples uploads from S3 latency
+spool = UploadSpool.from_env(lambda: settings.client('s3'))
+if spool is not None:
+    spool.register_action('start_processing', start_processing)
 
 @app.route('/')
 def index():
     """Main page with upload form"""
-    return render_template('index.html')
+    return index_page.response()
 
 @app.route('/upload', methods=['POST'])
 def upload_document():
@@ -47,44 +68,63 @@ def upload_document():
             return jsonify({'error': 'No file selected'}), 400
         
         document_type = request.form.get('document_type', 'general')
+        upload_source = request.headers.get('X-Upload-Source') or request.form.get('upload_source', 'web_ui')
+        tenant, priority = admission.classify(
+            upload_source,
+            request.headers.get('X-Upload-Priority') or request.form.get('priority')
+        )
         
         # Generate unique document ID
         document_id = f"web-{uuid.uuid4()}"
         filename = secure_filename(file.filename)
         s3_key = f"web-uploads/{document_id}_{filename}"
         
-        # Upload to S3
-        s3_client.put_object(
-            Bucket=RAW_BUCKET,
-            Key=s3_key,
-            Body=file.read(),
-            Metadata={
-                'document_type': document_type,
-                'original_filename': filename,
-                'upload_source': 'web_ui'
-            }
-        )
-        
-        # Start Step Functions execution
-        execution_input = {
-            'document_id': document_id,
-            'source_bucket': RAW_BUCKET,
-            'source_key': s3_key
+        metadata = {
+            'document_type': document_type,
+            'original_filename': filename,
+            'upload_source': upload_source
         }
         
-        response = stepfunctions_client.start_execution(
-            stateMachineArn=STATE_MACHINE_ARN,
-            name=f"web-execution-{document_id}",
-            input=json.dumps(execution_input)
-        )
+        with admission.admit(tenant, priority):
+            if spool is not None:
+                try:
+                    spool.put(
+                        document_id, file.stream, settings.raw_bucket, s3_key, metadata,
+                        action='start_processing',
+                        action_args={'document_id': document_id, 'source_key': s3_key}
+                    )
+                    admission.pipeline_started(document_id, tenant)
+                    return jsonify({
+                        'success': True,
+                        'document_id': document_id,
+                        'spooled': True,
+                        'message': 'Document accepted; upload and processing will start shortly'
+                    }), 202
+                except SpoolFull:
+                    # Spool quota reached, upload directly instead
+                    file.stream.seek(0)
+            
+            # Upload to S3
+            settings.client('s3').put_object(
+                Bucket=settings.raw_bucket,
+                Key=s3_key,
+                Body=file.read(),
+                Metadata=metadata
+            )
+            
+            # Start Step Functions execution
+            execution_arn = start_processing(document_id, s3_key)
+            admission.pipeline_started(document_id, tenant)
         
         return jsonify({
             'success': True,
             'document_id': document_id,
-            'execution_arn': response['executionArn'],
+            'execution_arn': execution_arn,
             'message': 'Document uploaded and processing started'
         })
         
+    except Overloaded as e:
+        return jsonify({'error': str(e), 'retry_after': e.retry_after}), 429, {'Retry-After': str(e.retry_after)}
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -92,11 +132,13 @@ def upload_document():
 def get_status(document_id):
     """Get processing status for a document"""
     try:
-        table = dynamodb.Table(METADATA_TABLE)
+        table = settings.resource('dynamodb').Table(settings.metadata_table)
         response = table.get_item(Key={'document_id': document_id})
         
         if 'Item' in response:
             item = response['Item']
+            if item.get('status') in ('completed', 'failed'):
+                admission.pipeline_finished(document_id)
             return jsonify({
                 'document_id': document_id,
                 'status': item.get('status', 'unknown'),
@@ -106,6 +148,13 @@ def get_status(document_id):
                 'updated_timestamp': item.get('updated_timestamp', ''),
                 'has_results': item.get('status') == 'completed'
             })
+        elif spool is not None and spool.status(document_id):
+            # Accepted but not yet in S3; 'failed' means it was dead-lettered
+            return jsonify({
+                'document_id': document_id,
+                'status': spool.status(document_id),
+                'message': 'Document is waiting in the local upload spool'
+            })
         else:
             return jsonify({
                 'document_id': document_id,
@@ -120,7 +169,7 @@ def get_status(document_id):
 def get_results(document_id):
     """Get extraction results for a document"""
     try:
-        results_table = dynamodb.Table(f'aws-idp-system-extraction-results-{ENVIRONMENT}')
+        results_table = settings.resource('dynamodb').Table(settings.results_table)
         
         # Get final results
         response = results_table.get_item(
@@ -158,7 +207,7 @@ def get_results(document_id):
 def list_documents():
     """List recent documents"""
     try:
-        table = dynamodb.Table(METADATA_TABLE)
+        table = settings.resource('dynamodb').Table(settings.metadata_table)
         
         # Scan recent documents (in production, use GSI with pagination)
         response = table.scan(
@@ -184,6 +233,57 @@ def list_documents():
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+@app.route('/export')
+def export_documents():
+    """Stream metadata and results for many documents as JSONL or Arrow
+    
+    Filters: start, end (upload_timestamp range), status, document_type.
+    Each record carries a _cursor; pass it back as cursor to resume.
+    """
+    export_format = request.args.get('format', 'jsonl')
+    if export_format not in ('jsonl', 'arrow'):
+        return jsonify({'error': 'format must be jsonl or arrow'}), 400
+    
+    cursor = request.args.get('cursor')
+    if cursor:
+        try:
+            if not isinstance(decode_cursor(cursor), dict):
+                raise ValueError(cursor)
+        except ValueError:
+            return jsonify({'error': 'Invalid cursor'}), 400
+    
+    if export_format == 'arrow':
+        try:
+            require_pyarrow()
+        except RuntimeError as e:
+            return jsonify({'error': str(e)}), 501
+    
+    # Fail before the 200 headers are sent, not partway through the stream
+    try:
+        records = iter_records(
+            settings.resource('dynamodb'), settings.metadata_table, settings.results_table,
+            start=request.args.get('start'),
+            end=request.args.get('end'),
+            status=request.args.get('status'),
+            document_type=request.args.get('document_type'),
+            cursor=cursor
+        )
+        first = next(records, None)
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+    if first is not None:
+        records = itertools.chain([first], records)
+    
+    if export_format == 'arrow':
+        return Response(stream_with_context(iter_arrow_stream(records)),
+                        mimetype='application/vnd.apache.arrow.stream')
+    return Response(stream_with_context(iter_jsonl(records)), mimetype='application/x-ndjson')
+
+@app.route('/admission')
+def admission_stats():
+    """Current admission-control load"""
+    return jsonify(admission.stats())
+
 @app.route('/dashboard')
 def dashboard():
     """Dashboard page showing recent documents"""
@@ -0,0 +1,282 @@
+#!/usr/bin/env python3
+"""
+Streaming bulk export of document metadata and extraction results
+
+Pages through the metadata table with a filtered Scan, fetches the matching
+final results with BatchGetItem and yields one flat record at a time, so
+memory use stays constant however many documents are exported. Every
+record carries a cursor; passing it back resumes the export right after
+that record.
+
+Usage:
+    python export.py --start 2024-01-01 --end 2024-02-01 --status completed \\
+        --format parquet --output results.parquet
+"""
+
+import argparse
+import base64
+import json
+import sys
+import time
+from decimal import Decimal
+
+PAGE_SIZE = 100  # BatchGetItem accepts at most 100 keys
+ARROW_BATCH_SIZE = 1000
+
+SCHEMA_FIELDS = [
+    ('document_id', 'string'),
+    ('status', 'string'),
+    ('upload_timestamp', 'string'),
+    ('updated_timestamp', 'string'),
+    ('document_type', 'string'),
+    ('confidence_score', 'float64'),
+    ('processing_time_ms', 'int64'),
+    ('page_count', 'int64'),
+    ('has_tables', 'bool_'),
+    ('has_forms', 'bool_'),
+    ('has_signatures', 'bool_'),
+    ('raw_text', 'string'),
+    ('entities', 'string'),
+    ('tables', 'string'),
+    ('forms', 'string'),
+    ('_cursor', 'string'),
+]
+
+
+def encode_cursor(key):
+    return base64.urlsafe_b64encode(json.dumps(key, default=str).encode('utf-8')).decode('ascii')
+
+
+def decode_cursor(cursor):
+    return json.loads(base64.urlsafe_b64decode(cursor.encode('ascii')))
+
+
+def _json_default(value):
+    if isinstance(value, Decimal):
+        return int(value) if value == value.to_integral_value() else float(value)
+    raise TypeError(f'{type(value).__name__} is not JSON serializable')
+
+
+def build_filter(start=None, end=None, status=None, document_type=None):
+    """Scan FilterExpression for the export filters"""
+    from boto3.dynamodb.conditions import Attr
+
+    conditions = [Attr('upload_timestamp').exists()]
+    if start:
+        conditions.append(Attr('upload_timestamp').gte(start))
+    if end:
+        conditions.append(Attr('upload_timestamp').lt(end))
+    if status:
+        conditions.append(Attr('status').eq(status))
+    if document_type:
+        conditions.append(Attr('metadata.document_type').eq(document_type))
+
+    expression = conditions[0]
+    for condition in conditions[1:]:
+        expression = expression & condition
+    return expression
+
+
+def _batch_get_results(dynamodb, results_table, document_ids):
+    """Final results for a page of documents, retrying unprocessed keys"""
+    request = {
+        results_table: {
+            'Keys': [{'document_id': d, 'extraction_type': 'final_results'} for d in document_ids],
+            'ProjectionExpression': 'document_id, results'
+        }
+    }
+    found = {}
+    delay = 0.05
+    while request:
+        response = dynamodb.batch_get_item(RequestItems=request)
+        for item in response.get('Responses', {}).get(results_table, []):
+            found[item['document_id']] = item.get('results', {})
+        request = response.get('UnprocessedKeys') or None
+        if request:
+            time.sleep(delay)
+            delay = min(delay * 2, 2.0)
+    return found
+
+
+def _flatten(item, results, cursor):
+    metadata = item.get('metadata', {})
+    return {
+        'document_id': item['document_id'],
+        'status': item.get('status', 'unknown'),
+        'upload_timestamp': item.get('upload_timestamp', ''),
+        'updated_timestamp': item.get('updated_timestamp', ''),
+        'document_type': metadata.get('document_type', results.get('document_type', 'unknown')),
+        'confidence_score': float(metadata.get('final_confidence_score', results.get('confidence_score', 0))),
+        'processing_time_ms': int(item.get('total_processing_time_ms', 0)),
+        'page_count': int(results.get('page_count', 0)),
+        'has_tables': bool(results.get('has_tables', False)),
+        'has_forms': bool(results.get('has_forms', False)),
+        'has_signatures': bool(results.get('has_signatures', False)),
+        'raw_text': results.get('raw_text', ''),
+        'entities': json.dumps(results.get('entities', []), default=_json_default),
+        'tables': results.get('table_content', ''),
+        'forms': json.dumps(results.get('form_fields', {}), default=_json_default),
+        '_cursor': cursor
+    }
+
+
+def iter_records(dynamodb, metadata_table, results_table, start=None, end=None,
+                 status=None, document_type=None, cursor=None, page_size=PAGE_SIZE,
+                 segment=None, total_segments=None):
+    """Yield flat export records one at a time
+
+    dynamodb is a boto3 DynamoDB service resource. The cursor on each
+    record is the Scan key of that item, so resuming continues after it.
+    segment/total_segments split the table into parallel Scan segments so
+    large exports can run as several independent workers; a cursor is only
+    valid for the segment that produced it.
+    """
+    table = dynamodb.Table(metadata_table)
+    scan_kwargs = {
+        'Limit': page_size,
+        'FilterExpression': build_filter(start, end, status, document_type)
+    }
+    if total_segments:
+        scan_kwargs['Segment'] = segment or 0
+        scan_kwargs['TotalSegments'] = total_segments
+    if cursor:
+        scan_kwargs['ExclusiveStartKey'] = decode_cursor(cursor)
+
+    while True:
+        response = table.scan(**scan_kwargs)
+        items = response.get('Items', [])
+        if items:
+            results = _batch_get_results(dynamodb, results_table, [i['document_id'] for i in items])
+            for item in items:
+                record_cursor = encode_cursor({'document_id': item['document_id']})
+                yield _flatten(item, results.get(item['document_id'], {}), record_cursor)
+
+        last_key = response.get('LastEvaluatedKey')
+        if not last_key:
+            return
+        scan_kwargs['ExclusiveStartKey'] = last_key
+
+
+def iter_jsonl(records):
+    """Encode records as newline-delimited JSON, one line per record"""
+    for record in records:
+        yield json.dumps(record, default=_json_default) + '\n'
+
+
+def require_pyarrow():
+    """Import pyarrow on first columnar export; JSONL does not need it"""
+    try:
+        import pyarrow
+    except ImportError:
+        raise RuntimeError('pyarrow is required for Arrow and Parquet export: pip install pyarrow')
+    return pyarrow
+
+
+def arrow_schema():
+    pa = require_pyarrow()
+    return pa.schema([(name, getattr(pa, type_name)()) for name, type_name in SCHEMA_FIELDS])
+
+
+def iter_record_batches(records, batch_size=ARROW_BATCH_SIZE):
+    """Group records into Arrow RecordBatches of at most batch_size rows"""
+    pa = require_pyarrow()
+    schema = arrow_schema()
+    names = [name for name, _ in SCHEMA_FIELDS]
+    columns = {name: [] for name in names}
+    rows = 0
+    for record in records:
+        for name in names:
+            columns[name].append(record[name])
+        rows += 1
+        if rows == batch_size:
+            yield pa.RecordBatch.from_pydict(columns, schema=schema)
+            columns = {name: [] for name in names}
+            rows = 0
+    if rows:
+        yield pa.RecordBatch.from_pydict(columns, schema=schema)
+
+
+def iter_arrow_stream(records, batch_size=ARROW_BATCH_SIZE):
+    """Encode records as an Arrow IPC stream, yielding bytes per message
+
+    The stream is the schema message, one message per record batch and the
+    end-of-stream marker, so it can be sent as it is produced.
+    """
+    yield arrow_schema().serialize().to_pybytes()
+    for batch in iter_record_batches(records, batch_size):
+        yield batch.serialize().to_pybytes()
+    # End-of-stream marker: continuation token followed by zero length
+    yield b'\xff\xff\xff\xff\x00\x00\x00\x00'
+
+
+def write_parquet(records, path, batch_size=ARROW_BATCH_SIZE):
+    """Write records to a Parquet file, one row group per batch; returns row count"""
+    require_pyarrow()
+    import pyarrow.parquet as pq
+
+    rows = 0
+    with pq.ParquetWriter(path, arrow_schema(), compression='zstd') as writer:
+        for batch in iter_record_batches(records, batch_size):
+            writer.write_batch(batch)
+            rows += batch.num_rows
+    return rows
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Bulk export of document extraction results')
+    parser.add_argument('--start', help='Earliest upload_timestamp (inclusive, ISO 8601)')
+    parser.add_argument('--end', help='Latest upload_timestamp (exclusive, ISO 8601)')
+    parser.add_argument('--status', help='Only documents with this status')
+    parser.add_argument('--document-type', help='Only documents of this type')
+    parser.add_argument('--cursor', help='Resume after the record with this cursor')
+    parser.add_argument('--segment', type=int, help='Parallel scan segment handled by this run')
+    parser.add_argument('--total-segments', type=int, help='Number of parallel scan segments')
+    parser.add_argument('--format', choices=['jsonl', 'parquet', 'arrow'], default='jsonl')
+    parser.add_argument('--output', default='-', help='Output file, - for stdout (jsonl/arrow only)')
+    args = parser.parse_args(argv)
+
+    from settings import settings
+
+    records = iter_records(
+        settings.resource('dynamodb'),
+        settings.metadata_table,
+        settings.results_table,
+        start=args.start, end=args.end, status=args.status,
+        document_type=args.document_type, cursor=args.cursor,
+        segment=args.segment, total_segments=args.total_segments
+    )
+
+    last_cursor = None
+
+    def tracked(records):
+        nonlocal last_cursor
+        for record in records:
+            yield record
+            last_cursor = record['_cursor']
+
+    try:
+        if args.format == 'parquet':
+            if args.output == '-':
+                parser.error('--output is required for parquet')
+            rows = write_parquet(tracked(records), args.output)
+            print(f"Exported {rows} documents to {args.output}", file=sys.stderr)
+        else:
+            chunks = iter_jsonl(tracked(records)) if args.format == 'jsonl' else iter_arrow_stream(tracked(records))
+            binary = args.format == 'arrow'
+            if args.output == '-':
+                out = sys.stdout.buffer if binary else sys.stdout
+                for chunk in chunks:
+                    out.write(chunk)
+            else:
+                with open(args.output, 'wb' if binary else 'w', encoding=None if binary else 'utf-8') as out:
+                    for chunk in chunks:
+                        out.write(chunk)
+    except KeyboardInterrupt:
+        if last_cursor:
+            print(f"Interrupted; resume with --cursor {last_cursor}", file=sys.stderr)
+        return 130
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
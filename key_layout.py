@@ -0,0 +1,159 @@
+#!/usr/bin/env python3
+"""
+S3 key layout and local manifest index for uploaded documents
+
+Every upload gets a random document id and a key under a short hashed
+prefix, so concurrent uploads never collide and writes spread across S3
+partitions instead of piling onto one time-ordered prefix. The manifest
+records where each document went, so lookup and listing need no
+ListObjects calls.
+"""
+
+import hashlib
+import os
+import sqlite3
+import threading
+import uuid
+from datetime import datetime
+
+from werkzeug.utils import secure_filename
+
+from settings import settings
+
+# Hex characters of hashed prefix: 2 gives 256 prefixes
+SHARD_CHARS = 2
+HASH_CHUNK_SIZE = 1024 * 1024
+
+
+def new_document_id(prefix=''):
+    """Random, collision-free document id"""
+    return f"{prefix}{uuid.uuid4().hex}"
+
+
+def shard_for(document_id):
+    """Hashed prefix for a document id"""
+    return hashlib.sha1(document_id.encode('utf-8')).hexdigest()[:SHARD_CHARS]
+
+
+def object_key(document_id, filename):
+    """S3 key for a document: <shard>/<document_id>/<filename>"""
+    name = secure_filename(filename or '') or 'document'
+    return f"{shard_for(document_id)}/{document_id}/{name}"
+
+
+def hash_stream(fileobj):
+    """SHA-256 and size of a file object, rewound afterwards for upload"""
+    digest = hashlib.sha256()
+    size = 0
+    start = fileobj.tell()
+    for chunk in iter(lambda: fileobj.read(HASH_CHUNK_SIZE), b''):
+        digest.update(chunk)
+        size += len(chunk)
+    fileobj.seek(start)
+    return digest.hexdigest(), size
+
+
+class ManifestIndex:
+    """SQLite-backed index of document id -> bucket, key, size, hash, upload time
+
+    The database is opened on first use, at path or settings.manifest_path.
+    """
+
+    def __init__(self, path=None):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = None
+
+    def _connection(self):
+        """Open and initialise the database; caller holds self._lock"""
+        if self._conn is None:
+            if self.path is None:
+                self.path = settings.manifest_path
+            directory = os.path.dirname(os.path.abspath(self.path))
+            os.makedirs(directory, exist_ok=True)
+            conn = sqlite3.connect(self.path, check_same_thread=False)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS manifest (
+                    document_id TEXT PRIMARY KEY,
+                    bucket TEXT NOT NULL,
+                    s3_key TEXT NOT NULL,
+                    size INTEGER NOT NULL,
+                    sha256 TEXT NOT NULL,
+                    filename TEXT,
+                    uploaded_at TEXT NOT NULL
+                )
+            ''')
+            conn.execute('DROP INDEX IF EXISTS manifest_uploaded_at')
+            conn.execute('CREATE INDEX IF NOT EXISTS manifest_recent ON manifest (uploaded_at, document_id)')
+            conn.execute('CREATE INDEX IF NOT EXISTS manifest_sha256 ON manifest (sha256)')
+            conn.commit()
+            self._conn = conn
+        return self._conn
+
+    def record(self, document_id, bucket, s3_key, size, sha256, filename=None, uploaded_at=None):
+        """Add a document; raises sqlite3.IntegrityError if the id already exists"""
+        entry = {
+            'document_id': document_id,
+            'bucket': bucket,
+            's3_key': s3_key,
+            'size': size,
+            'sha256': sha256,
+            'filename': filename,
+            'uploaded_at': uploaded_at or datetime.utcnow().isoformat()
+        }
+        with self._lock:
+            self._connection().execute(
+                'INSERT INTO manifest VALUES '
+                '(:document_id, :bucket, :s3_key, :size, :sha256, :filename, :uploaded_at)',
+                entry
+            )
+            self._connection().commit()
+        return entry
+
+    def get(self, document_id):
+        with self._lock:
+            row = self._connection().execute(
+                'SELECT * FROM manifest WHERE document_id = ?', (document_id,)
+            ).fetchone()
+        return self._to_dict(row) if row else None
+
+    def find_by_hash(self, sha256):
+        """Documents with identical content"""
+        with self._lock:
+            rows = self._connection().execute(
+                'SELECT * FROM manifest WHERE sha256 = ? ORDER BY uploaded_at', (sha256,)
+            ).fetchall()
+        return [self._to_dict(row) for row in rows]
+
+    def list_recent(self, limit=20, before=None, before_id=None):
+        """Newest documents first
+
+        To page, pass the last entry's uploaded_at as before and its
+        document_id as before_id; ordering on both keeps documents that
+        share a timestamp from being skipped.
+        """
+        with self._lock:
+            if before:
+                rows = self._connection().execute(
+                    'SELECT * FROM manifest '
+                    'WHERE uploaded_at < ? OR (uploaded_at = ? AND document_id < ?) '
+                    'ORDER BY uploaded_at DESC, document_id DESC LIMIT ?',
+                    (before, before, before_id or '', limit)
+                ).fetchall()
+            else:
+                rows = self._connection().execute(
+                    'SELECT * FROM manifest ORDER BY uploaded_at DESC, document_id DESC LIMIT ?', (limit,)
+                ).fetchall()
+        return [self._to_dict(row) for row in rows]
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+    @staticmethod
+    def _to_dict(row):
+        keys = ('document_id', 'bucket', 's3_key', 'size', 'sha256', 'filename', 'uploaded_at')
+        return dict(zip(keys, row))
@@ -0,0 +1,223 @@
+#!/usr/bin/env python3
+"""
+Layout analysis and reading-order reconstruction for Textract blocks
+
+Line geometry for each page is loaded into NumPy arrays once; column
+gutters, full-width separators and row grouping are all computed with
+array operations, so multi-column invoices and forms read in order.
+"""
+
+import numpy as np
+
+# Histogram resolution used to find column gutters (page width = 1.0)
+GUTTER_BINS = 400
+# Minimum width of a gutter, as a fraction of page width
+MIN_GUTTER_WIDTH = 0.015
+# A gutter may be crossed by at most this fraction of the lines in the
+# busiest column, so a centred heading does not close it
+GUTTER_MAX_COVERAGE = 1 / 3
+# A column needs at least this many lines of running text, with a median
+# width of at least this fraction of the page, so the gaps inside forms
+# and tables (label/value pairs, cells) are not taken for gutters
+MIN_COLUMN_LINES = 3
+MIN_COLUMN_LINE_WIDTH = 0.15
+# Lines whose tops differ by less than this fraction of the median line
+# height are treated as one visual row
+ROW_TOLERANCE = 0.5
+
+
+def load_geometry(blocks, block_type='LINE'):
+    """Collect page, bounding box and text of every block of one type
+
+    Returns (pages, boxes, texts) where boxes is an (n, 4) float array of
+    left, top, right, bottom in page-relative coordinates.
+    """
+    selected = [b for b in blocks if b.get('BlockType') == block_type]
+    pages = np.fromiter((b.get('Page', 1) for b in selected), dtype=np.int32, count=len(selected))
+    boxes = np.array(
+        [[bb['Left'], bb['Top'], bb['Width'], bb['Height']]
+         for bb in (b['Geometry']['BoundingBox'] for b in selected)],
+        dtype=np.float64
+    ).reshape(-1, 4)
+    boxes[:, 2] += boxes[:, 0]
+    boxes[:, 3] += boxes[:, 1]
+    texts = [b.get('Text', '') for b in selected]
+    return pages, boxes, texts
+
+
+def _candidate_gutters(boxes):
+    """x positions of near-empty vertical runs between content
+
+    Coverage counts come from line extents with a difference array. A run
+    of bins covered by few lines (GUTTER_MAX_COVERAGE) is a candidate; the
+    gutter sits at the centre of its least covered stretch.
+    """
+    start = np.clip((boxes[:, 0] * GUTTER_BINS).astype(np.int64), 0, GUTTER_BINS - 1)
+    end = np.clip(np.ceil(boxes[:, 2] * GUTTER_BINS).astype(np.int64), start + 1, GUTTER_BINS)
+    delta = np.zeros(GUTTER_BINS + 1, dtype=np.int64)
+    np.add.at(delta, start, 1)
+    np.add.at(delta, end, -1)
+    coverage = np.cumsum(delta[:-1])
+
+    filled = np.flatnonzero(coverage)
+    inner = coverage[filled[0]:filled[-1] + 1]
+    sparse = inner <= GUTTER_MAX_COVERAGE * inner.max()
+    # Edges of sparse runs: +1 where a run starts, -1 where it ends
+    edges = np.diff(np.concatenate(([0], sparse.astype(np.int8), [0])))
+
+    centers = []
+    for lo, hi in zip(np.flatnonzero(edges == 1), np.flatnonzero(edges == -1)):
+        # Longest stretch of the run's minimum coverage
+        lowest = np.concatenate(([0], (inner[lo:hi] == inner[lo:hi].min()).astype(np.int8), [0]))
+        run_edges = np.diff(lowest)
+        run_start = np.flatnonzero(run_edges == 1)
+        run_end = np.flatnonzero(run_edges == -1)
+        longest = np.argmax(run_end - run_start)
+        if run_end[longest] - run_start[longest] >= MIN_GUTTER_WIDTH * GUTTER_BINS:
+            centers.append((run_start[longest] + run_end[longest]) / 2.0 + lo + filled[0])
+    return np.array(centers) / GUTTER_BINS
+
+
+def find_gutters(boxes):
+    """Return x positions of column gutters on one page
+
+    Lines wider than half the page are left out so headers and footers do
+    not bridge the columns beneath them. A candidate gutter is kept only
+    if the columns on both sides hold running text (MIN_COLUMN_LINES lines
+    of median width MIN_COLUMN_LINE_WIDTH, not counting lines that cross a
+    gutter); otherwise it is merged away, weakest column first.
+    """
+    narrow = boxes[(boxes[:, 2] - boxes[:, 0]) < 0.5]
+    if len(narrow) < 2:
+        return np.empty(0)
+
+    gutters = _candidate_gutters(narrow)
+    widths = narrow[:, 2] - narrow[:, 0]
+    while len(gutters):
+        col_left = np.searchsorted(gutters, narrow[:, 0])
+        inside = col_left == np.searchsorted(gutters, narrow[:, 2])
+        strength = np.array([
+            min(np.count_nonzero(members) / MIN_COLUMN_LINES,
+                np.median(widths[members]) / MIN_COLUMN_LINE_WIDTH) if members.any() else 0.0
+            for members in (inside & (col_left == c) for c in range(len(gutters) + 1))
+        ])
+        weakest = int(np.argmin(strength))
+        if strength[weakest] >= 1.0:
+            break
+        # Merge the weakest column into its neighbour
+        gutters = np.delete(gutters, min(weakest, len(gutters) - 1))
+    return gutters
+
+
+def order_page(boxes):
+    """Compute reading order and region labels for the lines of one page
+
+    Returns (order, region_keys): order is an index permutation of the
+    input lines, region_keys gives each line's (section, column) pair.
+    Full-width lines that cross a gutter split the page into sections;
+    within a section columns read left to right, top to bottom.
+    """
+    n = len(boxes)
+    if n == 0:
+        return np.empty(0, dtype=np.int64), np.empty((0, 2), dtype=np.int64)
+
+    left, top, right, bottom = boxes.T
+    gutters = find_gutters(boxes)
+
+    col_left = np.searchsorted(gutters, left)
+    col_right = np.searchsorted(gutters, right)
+    spanning = col_left != col_right
+    column = np.where(spanning, 0, col_left)
+
+    # Sections: content between consecutive spanning lines gets an even key,
+    # each spanning line gets the odd key that sits between its neighbours
+    span_tops = np.sort(top[spanning])
+    above = np.searchsorted(span_tops, top, side='right')
+    section = np.where(spanning, 2 * above - 1, 2 * above)
+
+    # Group visual rows so label/value pairs on one line read left to right
+    heights = bottom - top
+    tolerance = ROW_TOLERANCE * float(np.median(heights))
+    by_top = np.lexsort((top, column, section))
+    same_group = np.concatenate((
+        [False],
+        (section[by_top][1:] == section[by_top][:-1]) & (column[by_top][1:] == column[by_top][:-1])
+    ))
+    new_row = ~same_group | np.concatenate(([True], np.diff(top[by_top]) > tolerance))
+    row = np.empty(n, dtype=np.int64)
+    row[by_top] = np.cumsum(new_row)
+
+    order = np.lexsort((left, row))
+    return order, np.stack((section, column), axis=1)
+
+
+def analyze_layout(blocks, block_type='LINE'):
+    """Reconstruct reading order for every page of a Textract response
+
+    Returns a dict with the ordered 'text' stream, the ordered 'lines'
+    and 'regions' (one per page section/column, with its bounding box,
+    text and the [start, end) range of its entries in 'lines') so
+    downstream stages can reuse the layout without re-running OCR.
+    """
+    pages, boxes, texts = load_geometry(blocks, block_type)
+    if len(pages) == 0:
+        return {'text': '', 'lines': [], 'regions': [], 'page_count': 0}
+
+    by_page = np.argsort(pages, kind='stable')
+    page_ids, page_starts = np.unique(pages[by_page], return_index=True)
+    page_bounds = np.append(page_starts, len(by_page))
+
+    lines = []
+    regions = []
+    for page, lo, hi in zip(page_ids.tolist(), page_bounds[:-1], page_bounds[1:]):
+        index = by_page[lo:hi]
+        order, keys = order_page(boxes[index])
+        ordered = index[order]
+        keys = keys[order]
+
+        # Regions are runs of equal (section, column) in reading order
+        changes = np.flatnonzero(np.any(keys[1:] != keys[:-1], axis=1)) + 1
+        for members, key in zip(np.split(ordered, changes), keys[np.concatenate(([0], changes))]):
+            region_boxes = boxes[members]
+            region_lines = [texts[i] for i in members.tolist()]
+            first_line = len(lines)
+            lines.extend(region_lines)
+            regions.append({
+                'page': int(page),
+                'section': int(key[0]),
+                'column': int(key[1]),
+                'line_range': [first_line, len(lines)],
+                'bbox': [
+                    round(float(region_boxes[:, 0].min()), 4),
+                    round(float(region_boxes[:, 1].min()), 4),
+                    round(float(region_boxes[:, 2].max()), 4),
+                    round(float(region_boxes[:, 3].max()), 4)
+                ],
+                'text': '\n'.join(region_lines)
+            })
+
+    return {
+        'text': '\n\n'.join(region['text'] for region in regions),
+        'lines': lines,
+        'regions': regions,
+        'page_count': len(page_ids)
+    }
+
+
+def stored_regions(regions):
+    """Regions without their text, for storing next to the full text
+
+    A stored document then carries its text once; text_lines() of that
+    text recovers the lines each region's 'line_range' refers to.
+    """
+    return [{k: v for k, v in region.items() if k != 'text'} for region in regions]
+
+
+def text_lines(text):
+    """The 'lines' of analyze_layout() recovered from its 'text'"""
+    return [line for line in text.split('\n') if line]
+
+
+def reading_order_text(blocks):
+    """Text of a Textract response in reading order"""
+    return analyze_layout(blocks)['text']
@@ -1,36 +1,67 @@
 from flask import Flask, render_template, request, jsonify
-import boto3
+import io
 import json
 from datetime import datetime
+from decimal import Decimal
+from entities import extract_entities, get_entity_client
+from key_layout import ManifestIndex, hash_stream, new_document_id, object_key
+from settings import settings
+from static_assets import StaticAssets
 
 app = Flask(__name__)
+assets = StaticAssets(app)
+manifest = ManifestIndex()
+index_page = assets.page('modern-index.html')
 
 @app.route('/')
 def index():
-    return render_template('modern-index.html')
+    return index_page.response()
 
 @app.route('/upload', methods=['POST'])
 def upload():
     try:
         file = request.files['file']
-        s3 = boto3.client('s3', region_name='us-east-1')
+        s3 = settings.client('s3')
         
-        bucket = 'aws-idp-raw-774305598371-dev'
-        key = f"{datetime.now().strftime('%Y%m%d_%H%M%S')}_{file.filename}"
-        s3.upload_fileobj(file, bucket, key)
+        bucket = settings.legacy_raw_bucket
+        document_id = new_document_id()
+        key = object_key(document_id, file.filename)
+        content_hash, size = hash_stream(file.stream)
+        # Kept for the quality gate: the S3 transfer closes the stream it uploads
+        content = file.read()
+        s3.upload_fileobj(io.BytesIO(content), bucket, key)
+        manifest.record(document_id, bucket, key, size, content_hash, file.filename)
         
-        textract = boto3.client('textract', region_name='us-east-1')
+        textract = settings.client('textract')
         response = textract.detect_document_text(
             Document={'S3Object': {'Bucket': bucket, 'Name': key}}
         )
         
-        text = ' '.join([block['Text'] for block in response['Blocks'] if block['BlockType'] == 'LINE'])
+        # Imported here so NumPy stays off the startup path
+        from layout import analyze_layout, stored_regions
+        from quality import PageReprocessor, page_confidences, reprocess_low_confidence
+        reprocessor = PageReprocessor(textract, bucket, key, content=content, filename=file.filename)
+        blocks, reprocessed = reprocess_low_confidence(response['Blocks'], reprocessor)
+        layout = analyze_layout(blocks)
+        page_confidence = page_confidences(blocks)
+        text = layout['text']
+        try:
+            entities, entity_errors = extract_entities(text, get_entity_client())
+        except Exception as e:
+            # Entities are optional; the OCR result is still stored
+            entities, entity_errors = [], [{'offset': 0, 'error_code': type(e).__name__, 'message': str(e)}]
         
-        dynamodb = boto3.resource('dynamodb', region_name='us-east-1')
-        table = dynamodb.Table('aws-idp-documents-dev')
+        dynamodb = settings.resource('dynamodb')
+        table = dynamodb.Table(settings.documents_table)
         table.put_item(Item={
-            'document_id': key,
+            'document_id': document_id,
+            's3_key': key,
             'extracted_text': text,
+            'regions': json.loads(json.dumps(stored_regions(layout['regions'])), parse_float=Decimal),
+            'entities': json.loads(json.dumps(entities), parse_float=Decimal),
+            'entity_errors': entity_errors,
+            'page_confidence': json.loads(json.dumps(page_confidence), parse_float=Decimal),
+            'reprocessed_pages': json.loads(json.dumps(reprocessed), parse_float=Decimal),
             'status': 'completed',
             'timestamp': datetime.utcnow().isoformat(),
             'filename': file.filename
@@ -38,10 +69,14 @@ def upload():
         
         return jsonify({
             'status': 'success', 
-            'document_id': key, 
+            'document_id': document_id, 
             'text': text[:500],
             'filename': file.filename,
-            'word_count': len(text.split())
+            'entities': entities,
+            'entity_errors': entity_errors,
+            'word_count': len(text.split()),
+            'page_confidence': page_confidence,
+            'reprocessed_pages': reprocessed
         })
     except Exception as e:
         return jsonify({'status': 'error', 'message': str(e)})
@@ -49,12 +84,26 @@ def upload():
 @app.route('/documents')
 def documents():
     try:
-        dynamodb = boto3.resource('dynamodb', region_name='us-east-1')
-        table = dynamodb.Table('aws-idp-documents-dev')
+        dynamodb = settings.resource('dynamodb')
+        table = dynamodb.Table(settings.documents_table)
         response = table.scan()
         return jsonify(response['Items'])
     except Exception as e:
         return jsonify([])
 
+@app.route('/manifest')
+def manifest_index():
+    before = request.args.get('before')
+    limit = max(1, min(request.args.get('limit', 20, type=int), 1000))
+    return jsonify(manifest.list_recent(limit=limit, before=before,
+                                        before_id=request.args.get('before_id')))
+
+@app.route('/manifest/<document_id>')
+def manifest_entry(document_id):
+    entry = manifest.get(document_id)
+    if entry is None:
+        return jsonify({'status': 'error', 'message': 'Document not found'}), 404
+    return jsonify(entry)
+
 if __name__ == '__main__':
     app.run(debug=True, port=5000)
\ No newline at end of file
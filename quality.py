@@ -0,0 +1,183 @@
+#!/usr/bin/env python3
+"""
+Confidence-driven selective reprocessing of low-quality pages
+
+Per-page OCR confidence is computed from Textract WORD confidences with
+NumPy. Only pages under the threshold are run again, through enhanced
+image preprocessing and/or the richer AnalyzeDocument API, and a page's
+blocks are replaced only when the new pass scores higher, so the extra
+OCR cost is limited to the pages that need it.
+"""
+
+import io
+
+import numpy as np
+
+from settings import settings
+
+# AnalyzeDocument accepts at most 10 MB of inline bytes
+MAX_DOCUMENT_BYTES = 10 * 1024 * 1024
+IMAGE_EXTENSIONS = ('.png', '.jpg', '.jpeg', '.tif', '.tiff', '.bmp')
+
+
+def page_confidences(blocks, block_type='WORD'):
+    """Mean Textract confidence (0-100) per page, as {page: confidence}
+
+    Every page with a PAGE block is included; a page on which no words
+    were found scores 0 so it is the first to be re-run.
+    """
+    scores = {int(b.get('Page', 1)): 0.0 for b in blocks if b.get('BlockType') == 'PAGE'}
+    selected = [b for b in blocks if b.get('BlockType') == block_type and 'Confidence' in b]
+    if not selected:
+        return scores
+
+    pages = np.fromiter((b.get('Page', 1) for b in selected), dtype=np.int64, count=len(selected))
+    confidence = np.fromiter((b['Confidence'] for b in selected), dtype=np.float64, count=len(selected))
+    page_ids, index = np.unique(pages, return_inverse=True)
+    means = np.bincount(index, weights=confidence) / np.bincount(index)
+    scores.update((int(page), round(float(mean), 2)) for page, mean in zip(page_ids, means))
+    return scores
+
+
+def document_confidence(blocks):
+    """Mean WORD confidence across the whole document (0-100)"""
+    confidence = np.fromiter(
+        (b['Confidence'] for b in blocks if b.get('BlockType') == 'WORD' and 'Confidence' in b),
+        dtype=np.float64
+    )
+    return round(float(confidence.mean()), 2) if len(confidence) else 0.0
+
+
+def low_confidence_pages(blocks, threshold=None):
+    """Pages whose mean confidence is below threshold, lowest first
+
+    threshold defaults to settings.ocr_confidence_threshold.
+    """
+    if threshold is None:
+        threshold = settings.ocr_confidence_threshold
+    scores = page_confidences(blocks)
+    return sorted((p for p, c in scores.items() if c < threshold), key=scores.get)
+
+
+def splice_page(blocks, page, replacement):
+    """Replace every block of one page with the blocks of a new pass"""
+    for block in replacement:
+        block['Page'] = page
+    kept = [b for b in blocks if b.get('Page', 1) != page]
+    return kept + list(replacement)
+
+
+def reprocess_low_confidence(blocks, rerun_page, threshold=None):
+    """Re-run only pages under threshold and splice improved results back
+
+    rerun_page(page) returns (blocks, strategy) for one page, or None when
+    the page cannot be re-run. A new pass is kept only if it raises that
+    page's confidence. Returns (blocks, report) where report lists each
+    re-run page with its confidence before and after.
+    """
+    report = []
+    before = page_confidences(blocks)
+    for page in low_confidence_pages(blocks, threshold):
+        try:
+            result = rerun_page(page)
+        except Exception as e:
+            report.append({'page': page, 'before': before[page], 'after': None,
+                           'strategy': None, 'accepted': False, 'error': str(e)})
+            continue
+        if result is None:
+            report.append({'page': page, 'before': before[page], 'after': None,
+                           'strategy': None, 'accepted': False})
+            continue
+
+        new_blocks, strategy = result
+        after = document_confidence(new_blocks)
+        accepted = after > before[page]
+        if accepted:
+            blocks = splice_page(blocks, page, new_blocks)
+        report.append({'page': page, 'before': before[page], 'after': after,
+                       'strategy': strategy, 'accepted': accepted})
+    return blocks, report
+
+
+def enhance_image(content):
+    """Grayscale, autocontrast, sharpen and upscale small scans; PNG bytes
+
+    Returns None when Pillow is not installed or the result would be too
+    large to send inline.
+    """
+    try:
+        from PIL import Image, ImageFilter, ImageOps
+    except ImportError:
+        return None
+
+    image = Image.open(io.BytesIO(content))
+    image = ImageOps.autocontrast(ImageOps.grayscale(image), cutoff=1)
+    if max(image.size) < 2000:
+        image = image.resize((image.width * 2, image.height * 2), Image.LANCZOS)
+    image = image.filter(ImageFilter.SHARPEN)
+
+    out = io.BytesIO()
+    image.save(out, format='PNG', optimize=True)
+    data = out.getvalue()
+    return data if len(data) <= MAX_DOCUMENT_BYTES else None
+
+
+def extract_pdf_page(content, page):
+    """Single-page PDF bytes for one page (1-based), or None without pypdf"""
+    try:
+        from pypdf import PdfReader, PdfWriter
+    except ImportError:
+        return None
+
+    reader = PdfReader(io.BytesIO(content))
+    if page > len(reader.pages):
+        return None
+    writer = PdfWriter()
+    writer.add_page(reader.pages[page - 1])
+    out = io.BytesIO()
+    writer.write(out)
+    return out.getvalue()
+
+
+class PageReprocessor:
+    """rerun_page implementation backed by Textract
+
+    content is the uploaded file's bytes, read before the upload since the
+    S3 transfer closes the stream it is given. Images are re-run through
+    enhanced preprocessing and AnalyzeDocument (tables and forms); single
+    pages of a PDF are split out with pypdf when it is installed. Otherwise
+    a single-page document is re-run through AnalyzeDocument from S3.
+    """
+
+    FEATURE_TYPES = ['TABLES', 'FORMS']
+
+    def __init__(self, textract, bucket, key, content=None, filename=None, page_count=1):
+        self.textract = textract
+        self.bucket = bucket
+        self.key = key
+        self.content = content
+        self.filename = (filename or key).lower()
+        self.page_count = page_count
+
+    def _analyze(self, document):
+        response = self.textract.analyze_document(Document=document, FeatureTypes=self.FEATURE_TYPES)
+        return response['Blocks']
+
+    def __call__(self, page):
+        content = self.content
+
+        if content and self.filename.endswith(IMAGE_EXTENSIONS):
+            enhanced = enhance_image(content)
+            if enhanced is not None:
+                return self._analyze({'Bytes': enhanced}), 'enhanced_image+analyze_document'
+
+        if content and self.filename.endswith('.pdf') and self.page_count > 1:
+            single = extract_pdf_page(content, page)
+            if single is not None and len(single) <= MAX_DOCUMENT_BYTES:
+                return self._analyze({'Bytes': single}), 'pdf_page+analyze_document'
+            return None
+
+        if self.page_count == 1:
+            document = {'S3Object': {'Bucket': self.bucket, 'Name': self.key}}
+            return self._analyze(document), 'analyze_document'
+        return None
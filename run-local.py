@@ -3,8 +3,18 @@
 Local development server for the web UI
 """
 
-from modern-app import app
+import importlib.util
 import os
+import sys
+
+# modern-app.py is not a valid module name, so load it by path
+_spec = importlib.util.spec_from_file_location(
+    'modern_app', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'modern-app.py')
+)
+_module = importlib.util.module_from_spec(_spec)
+sys.modules['modern_app'] = _module  # lets Flask find templates next to the file
+_spec.loader.exec_module(_module)
+app = _module.app
 
 if __name__ == '__main__':
     print("🚀 Starting AWS IDP Web UI")
@@ -0,0 +1,163 @@
+#!/usr/bin/env python3
+"""
+Shared, lazily resolved configuration for every app
+
+Nothing here touches the network or imports boto3 at import time. Values
+come from the environment on first access; the AWS account id is read from
+AWS_ACCOUNT_ID or looked up once per process through STS. AWS clients are
+created on first use and cached per process, so forked workers never share
+a connection pool; resources, which are not thread-safe, are built per
+thread from one shared session.
+
+Environment:
+    AWS_REGION, ENVIRONMENT, AWS_ACCOUNT_ID
+    RAW_BUCKET, METADATA_TABLE, RESULTS_TABLE, STATE_MACHINE_ARN
+    LEGACY_RAW_BUCKET, DOCUMENTS_TABLE, PROCESSING_FUNCTION
+    OCR_CONFIDENCE_THRESHOLD, DATA_DIR, MANIFEST_PATH
+"""
+
+import os
+import threading
+from functools import cached_property
+
+
+class Settings:
+    def __init__(self, environ=None):
+        self._environ = os.environ if environ is None else environ
+        self._lock = threading.Lock()
+        self._clients = {}
+        self._session = None
+        self._pid = os.getpid()
+        self._local = threading.local()
+        self._account_lock = threading.Lock()
+        self._account_id = None
+
+    def _get(self, name):
+        return self._environ.get(name) or None
+
+    @cached_property
+    def region(self):
+        return self._get('AWS_REGION') or 'us-east-1'
+
+    @cached_property
+    def environment(self):
+        return self._get('ENVIRONMENT') or 'dev'
+
+    @property
+    def account_id(self):
+        """AWS_ACCOUNT_ID, or a single STS lookup shared by all threads"""
+        if self._account_id is None:
+            with self._account_lock:
+                if self._account_id is None:
+                    self._account_id = (
+                        self._get('AWS_ACCOUNT_ID')
+                        or self.client('sts').get_caller_identity()['Account']
+                    )
+        return self._account_id
+
+    # Resources of the Step Functions pipeline (app.py and the upload apps)
+
+    @cached_property
+    def raw_bucket(self):
+        return (self._get('RAW_BUCKET')
+                or f'aws-idp-system-documents-raw-{self.account_id}-{self.environment}')
+
+    @cached_property
+    def metadata_table(self):
+        return self._get('METADATA_TABLE') or f'aws-idp-system-document-metadata-{self.environment}'
+
+    @cached_property
+    def results_table(self):
+        return self._get('RESULTS_TABLE') or f'aws-idp-system-extraction-results-{self.environment}'
+
+    @cached_property
+    def state_machine_arn(self):
+        return (self._get('STATE_MACHINE_ARN')
+                or f'arn:aws:states:{self.region}:{self.account_id}:stateMachine:'
+                   f'aws-idp-system-document-processing-{self.environment}')
+
+    # Resources of the direct Textract apps (modern-app, simple-app, working-app)
+
+    @cached_property
+    def legacy_raw_bucket(self):
+        return self._get('LEGACY_RAW_BUCKET') or f'aws-idp-raw-{self.account_id}-{self.environment}'
+
+    @cached_property
+    def documents_table(self):
+        return self._get('DOCUMENTS_TABLE') or f'aws-idp-documents-{self.environment}'
+
+    @cached_property
+    def processing_function(self):
+        return self._get('PROCESSING_FUNCTION') or 'aws-idp-processing'
+
+    @cached_property
+    def ocr_confidence_threshold(self):
+        """Pages with a lower mean OCR confidence (0-100) are re-run"""
+        return float(self._get('OCR_CONFIDENCE_THRESHOLD') or 80)
+
+    # Local state
+
+    @cached_property
+    def data_dir(self):
+        """Writable directory for local state, outside the code directory"""
+        default = os.path.join(
+            self._get('XDG_DATA_HOME') or os.path.join(os.path.expanduser('~'), '.local', 'share'),
+            'aws-idp'
+        )
+        return self._get('DATA_DIR') or default
+
+    @cached_property
+    def manifest_path(self):
+        return self._get('MANIFEST_PATH') or os.path.join(self.data_dir, 'manifest.db')
+
+    def _session_locked(self):
+        """Process-wide boto3 session; caller holds self._lock"""
+        if os.getpid() != self._pid:
+            # Forked worker: the parent's session and clients must not be reused
+            self._session = None
+            self._clients.clear()
+            self._pid = os.getpid()
+        if self._session is None:
+            import boto3
+            self._session = boto3.session.Session()
+        return self._session
+
+    def client(self, service_name, region_name=None):
+        """Process-wide boto3 client, created on first use"""
+        with self._lock:
+            session = self._session_locked()
+            key = (service_name, region_name or self.region)
+            if key not in self._clients:
+                self._clients[key] = session.client(service_name, region_name=key[1])
+            return self._clients[key]
+
+    def resource(self, service_name, region_name=None):
+        """boto3 resource for the calling thread, created on first use
+
+        Resources are not thread-safe, so each thread gets its own, built
+        from the shared session so a new thread pays for the resource only,
+        not for loading a session.
+        """
+        local = self._local
+        if getattr(local, 'pid', None) != os.getpid():
+            local.pid = os.getpid()
+            local.resources = {}
+        key = (service_name, region_name or self.region)
+        if key not in local.resources:
+            with self._lock:
+                local.resources[key] = self._session_locked().resource(service_name, region_name=key[1])
+        return local.resources[key]
+
+    def reset(self):
+        """Forget resolved values and clients, e.g. after changing the environment"""
+        with self._lock:
+            self._clients.clear()
+            self._session = None
+            self._local = threading.local()
+        self._account_id = None
+        for name in list(vars(self)):
+            if not name.startswith('_'):
+                del self.__dict__[name]
+
+
+settings = Settings()
@@ -1,94 +1,85 @@
 from flask import Flask, render_template, request, jsonify
-import boto3
+import io
 import json
 from datetime import datetime
+from decimal import Decimal
+from entities import extract_entities, get_entity_client
+from key_layout import ManifestIndex, hash_stream, new_document_id, object_key
+from settings import settings
+from static_assets import StaticAssets
 
 app = Flask(__name__)
+assets = StaticAssets(app)
+manifest = ManifestIndex()
+index_page = assets.page('simple-index.html')
 
 @app.route('/')
 def index():
-    return '''
-<!DOCTYPE html>
-<html>
-<head><title>AWS IDP System</title></head>
-<body>
-    <h1>Document Processing System</h1>
-    <form id="uploadForm" enctype="multipart/form-data">
-        <input type="file" id="fileInput" accept=".pdf,.jpg,.png">
-        <button type="submit">Upload & Process</button>
-    </form>
-    <div id="results"></div>
-    
-    <h2>Processed Documents</h2>
-    <div id="documents"></div>
-    
-    <script>
-        document.getElementById('uploadForm').onsubmit = async (e) => {
-            e.preventDefault();
-            const file = document.getElementById('fileInput').files[0];
-            if (!file) return;
-            
-            const formData = new FormData();
-            formData.append('file', file);
-            
-            const response = await fetch('/upload', {method: 'POST', body: formData});
-            const result = await response.json();
-            document.getElementById('results').innerHTML = '<pre>' + JSON.stringify(result, null, 2) + '</pre>';
-            loadDocuments();
-        };
-        
-        async function loadDocuments() {
-            const response = await fetch('/documents');
-            const docs = await response.json();
-            document.getElementById('documents').innerHTML = docs.map(doc => 
-                '<div><strong>' + doc.document_id + '</strong><br>' + 
-                (doc.extracted_text || 'Processing...') + '</div>'
-            ).join('<hr>');
-        }
-        
-        loadDocuments();
-    </script>
-</body>
-</html>'''
+    return index_page.response()
 
 @app.route('/upload', methods=['POST'])
 def upload():
     try:
         file = request.files['file']
-        s3 = boto3.client('s3', region_name='us-east-1')
+        s3 = settings.client('s3')
         
         # Upload to S3
-        bucket = 'aws-idp-raw-774305598371-dev'
-        key = f"{datetime.now().strftime('%Y%m%d_%H%M%S')}_{file.filename}"
-        s3.upload_fileobj(file, bucket, key)
+        bucket = settings.legacy_raw_bucket
+        document_id = new_document_id()
+        key = object_key(document_id, file.filename)
+        content_hash, size = hash_stream(file.stream)
+        # Kept for the quality gate: the S3 transfer closes the stream it uploads
+        content = file.read()
+        s3.upload_fileobj(io.BytesIO(content), bucket, key)
+        manifest.record(document_id, bucket, key, size, content_hash, file.filename)
         
         # Process with Textract
-        textract = boto3.client('textract', region_name='us-east-1')
+        textract = settings.client('textract')
         response = textract.detect_document_text(
             Document={'S3Object': {'Bucket': bucket, 'Name': key}}
         )
         
-        text = ' '.join([block['Text'] for block in response['Blocks'] if block['BlockType'] == 'LINE'])
+        # Imported here so NumPy stays off the startup path
+        from layout import analyze_layout, stored_regions
+        from quality import PageReprocessor, page_confidences, reprocess_low_confidence
+        reprocessor = PageReprocessor(textract, bucket, key, content=content, filename=file.filename)
+        blocks, reprocessed = reprocess_low_confidence(response['Blocks'], reprocessor)
+        layout = analyze_layout(blocks)
+        page_confidence = page_confidences(blocks)
+        text = layout['text']
+        try:
+            entities, entity_errors = extract_entities(text, get_entity_client())
+        except Exception as e:
+            # Entities are optional; the OCR result is still stored
+            entities, entity_errors = [], [{'offset': 0, 'error_code': type(e).__name__, 'message': str(e)}]
         
         # Store in DynamoDB
-        dynamodb = boto3.resource('dynamodb', region_name='us-east-1')
-        table = dynamodb.Table('aws-idp-documents-dev')
+        dynamodb = settings.resource('dynamodb')
+        table = dynamodb.Table(settings.documents_table)
         table.put_item(Item={
-            'document_id': key,
+            'document_id': document_id,
+            's3_key': key,
             'extracted_text': text,
+            'regions': json.loads(json.dumps(stored_regions(layout['regions'])), parse_float=Decimal),
+            'entities': json.loads(json.dumps(entities), parse_float=Decimal),
+            'entity_errors': entity_errors,
+            'page_confidence': json.loads(json.dumps(page_confidence), parse_float=Decimal),
+            'reprocessed_pages': json.loads(json.dumps(reprocessed), parse_float=Decimal),
             'status': 'completed',
             'timestamp': datetime.utcnow().isoformat()
         })
         
-        return jsonify({'status': 'success', 'document_id': key, 'text': text[:500]})
+        return jsonify({'status': 'success', 'document_id': document_id, 'text': text[:500], 'entities': entities,
+                        'entity_errors': entity_errors,
+                        'page_confidence': page_confidence, 'reprocessed_pages': reprocessed})
     except Exception as e:
         return jsonify({'status': 'error', 'message': str(e)})
 
 @app.route('/documents')
 def documents():
     try:
-        dynamodb = boto3.resource('dynamodb', region_name='us-east-1')
-        table = dynamodb.Table('aws-idp-documents-dev')
+        dynamodb = settings.resource('dynamodb')
+        table = dynamodb.Table(settings.documents_table)
         response = table.scan()
         return jsonify(response['Items'])
     except Exception as e:
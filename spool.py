@@ -0,0 +1,332 @@
+#!/usr/bin/env python3
+"""
+Durable local write-ahead spool for uploads
+
+An upload is written and fsynced to a local directory together with its
+metadata and acknowledged straight away; background flushers then copy it
+to S3 and run its follow-up action (e.g. starting the Step Functions
+execution) with retries. Entries left on disk by a crash are picked up
+again on restart, and a byte quota bounds how much can be spooled.
+"""
+
+import json
+import logging
+import os
+import queue
+import re
+import shutil
+import threading
+import time
+
+try:
+    import fcntl
+except ImportError:  # not available on Windows; single-process use only
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+ENTRY_ID = re.compile(r'^[A-Za-z0-9_.-]{1,200}$')
+# Leftover temp/orphan files older than this are from a crashed writer;
+# younger ones may still be in progress in another worker process
+STALE_AFTER = 3600
+
+
+class SpoolFull(Exception):
+    """Raised when spooling an upload would exceed the disk quota"""
+
+
+def _fsync_dir(path):
+    try:
+        fd = os.open(path, os.O_RDONLY)
+    except OSError:  # directories cannot be opened on Windows
+        return
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+def _write_durably(path, write):
+    """Write via a temp file, fsync it and atomically move it into place"""
+    tmp = path + '.tmp'
+    with open(tmp, 'wb') as f:
+        write(f)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+
+
+class UploadSpool:
+    """Write-ahead spool directory with background S3 flushers
+
+    client_factory  callable returning an S3 client, called once per flusher
+    max_bytes       quota for spooled data, including dead-lettered entries
+    max_attempts    failed flushes before an entry moves to failed/
+    """
+
+    def __init__(self, directory, client_factory, max_bytes=1024 ** 3, flushers=2,
+                 max_attempts=8, base_delay=0.5, max_delay=300.0, rescan_interval=5.0):
+        self.directory = directory
+        self.failed_directory = os.path.join(directory, 'failed')
+        self.client_factory = client_factory
+        self.max_bytes = max_bytes
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.rescan_interval = rescan_interval
+        self.actions = {}
+
+        os.makedirs(self.failed_directory, exist_ok=True)
+        self._lock = threading.Lock()
+        self._pending = queue.Queue()
+        self._claimed = set()
+        self._bytes = 0
+        self._owner_fd = None
+        self._stopped = threading.Event()
+
+        self._recover()
+        self._threads = [
+            threading.Thread(target=self._run, name=f'upload-spool-{i}', daemon=True)
+            for i in range(flushers)
+        ]
+        for thread in self._threads:
+            thread.start()
+
+    @classmethod
+    def from_env(cls, client_factory):
+        """Spool configured from UPLOAD_SPOOL_* variables, or None if disabled"""
+        directory = os.environ.get('UPLOAD_SPOOL_DIR')
+        if not directory:
+            return None
+        return cls(
+            directory,
+            client_factory,
+            max_bytes=int(os.environ.get('UPLOAD_SPOOL_MAX_MB', 1024)) * 1024 * 1024,
+            flushers=int(os.environ.get('UPLOAD_SPOOL_FLUSHERS', 2)),
+            max_attempts=int(os.environ.get('UPLOAD_SPOOL_MAX_ATTEMPTS', 8))
+        )
+
+    def register_action(self, name, func):
+        """Register a follow-up run after an entry reaches S3
+
+        Actions are stored by name so they survive restarts; func is called
+        with the entry's action_args as keyword arguments and must be safe
+        to repeat.
+        """
+        self.actions[name] = func
+
+    def _paths(self, entry_id, directory=None):
+        base = os.path.join(directory or self.directory, entry_id)
+        return base + '.data', base + '.json'
+
+    def put(self, entry_id, fileobj, bucket, key, metadata=None, action=None, action_args=None):
+        """Durably spool an upload; returns once data and metadata are on disk
+
+        Raises SpoolFull if the quota would be exceeded, in which case the
+        caller should upload directly.
+        """
+        if not ENTRY_ID.match(entry_id):
+            raise ValueError(f'Invalid spool entry id: {entry_id}')
+        if action is not None and action not in self.actions:
+            raise ValueError(f'Unknown spool action: {action}')
+
+        data_path, meta_path = self._paths(entry_id)
+        _write_durably(data_path, lambda f: shutil.copyfileobj(fileobj, f))
+        size = os.path.getsize(data_path)
+
+        with self._lock:
+            if self._bytes + size > self.max_bytes:
+                os.remove(data_path)
+                raise SpoolFull(f'Upload spool quota of {self.max_bytes} bytes reached')
+            self._bytes += size
+
+        entry = {
+            'id': entry_id,
+            'bucket': bucket,
+            'key': key,
+            'metadata': metadata or {},
+            'action': action,
+            'action_args': action_args or {},
+            'size': size,
+            'uploaded': False,
+            'attempts': 0,
+            'next_attempt': 0,
+            'spooled_at': time.time()
+        }
+        _write_durably(meta_path, lambda f: f.write(json.dumps(entry).encode('utf-8')))
+        _fsync_dir(self.directory)
+
+        with self._lock:
+            self._claimed.add(entry_id)
+        self._pending.put(entry_id)
+        return entry
+
+    def status(self, entry_id):
+        """'spooled', 'failed' or None if the entry is not in the spool"""
+        if not ENTRY_ID.match(entry_id):
+            return None
+        if os.path.exists(self._paths(entry_id)[1]):
+            return 'spooled'
+        if os.path.exists(self._paths(entry_id, self.failed_directory)[1]):
+            return 'failed'
+        return None
+
+    def stats(self):
+        with self._lock:
+            return {
+                'bytes': self._bytes,
+                'max_bytes': self.max_bytes,
+                'pending': self._pending.qsize(),
+                'owner': self._owner_fd is not None
+            }
+
+    def stop(self, timeout=None):
+        self._stopped.set()
+        for thread in self._threads:
+            thread.join(timeout)
+
+    def _recover(self):
+        """Drop stale half-written files and recount spooled bytes from disk
+
+        Entries left by a crash stay in place and are picked up by _scan.
+        """
+        total = 0
+        now = time.time()
+        for directory in (self.directory, self.failed_directory):
+            names = set(os.listdir(directory))
+            for name in names:
+                path = os.path.join(directory, name)
+                try:
+                    stat = os.stat(path)
+                except FileNotFoundError:
+                    continue
+                orphan = name.endswith('.tmp') or (
+                    name.endswith('.data') and name[:-5] + '.json' not in names
+                )
+                if orphan and now - stat.st_mtime > STALE_AFTER:
+                    os.remove(path)
+                elif name.endswith('.data') or name.endswith('.data.tmp'):
+                    total += stat.st_size
+        with self._lock:
+            self._bytes = total
+
+    def _acquire_ownership(self):
+        """Only one process flushes a spool directory at a time"""
+        with self._lock:
+            if self._owner_fd is not None:
+                return True
+            fd = os.open(os.path.join(self.directory, 'spool.lock'), os.O_RDWR | os.O_CREAT)
+            if fcntl is not None:
+                try:
+                    fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                except OSError:
+                    os.close(fd)
+                    return False
+            self._owner_fd = fd
+            return True
+
+    def _scan(self):
+        """Queue entries on disk that are due and not already in progress"""
+        now = time.time()
+        for name in sorted(os.listdir(self.directory)):
+            if not name.endswith('.json'):
+                continue
+            entry_id = name[:-5]
+            with self._lock:
+                if entry_id in self._claimed:
+                    continue
+            try:
+                with open(os.path.join(self.directory, name), 'rb') as f:
+                    entry = json.loads(f.read())
+            except (OSError, ValueError):
+                continue
+            if entry.get('next_attempt', 0) <= now:
+                with self._lock:
+                    self._claimed.add(entry_id)
+                self._pending.put(entry_id)
+
+    def _run(self):
+        """Flusher loop; never exits before stop() while it may own the spool"""
+        client = None
+        last_scan = 0.0
+        while not self._stopped.is_set():
+            try:
+                if not self._acquire_ownership():
+                    # Another process flushes; keep the quota view current
+                    self._recover()
+                    self._stopped.wait(self.rescan_interval)
+                    continue
+                # Rescan even under load so entries waiting on a retry are not starved
+                if time.monotonic() - last_scan >= self.rescan_interval:
+                    last_scan = time.monotonic()
+                    self._recover()
+                    self._scan()
+            except Exception:
+                logger.exception('Upload spool scan failed; retrying')
+                self._stopped.wait(self.rescan_interval)
+                continue
+
+            try:
+                entry_id = self._pending.get(timeout=self.rescan_interval)
+            except queue.Empty:
+                continue
+
+            try:
+                if client is None:
+                    client = self.client_factory()
+                self._flush(client, entry_id)
+            except Exception:
+                # Entry stays on disk and is picked up again by the next scan
+                logger.exception('Flushing spooled upload %s failed', entry_id)
+                self._stopped.wait(min(self.base_delay, self.rescan_interval))
+            finally:
+                with self._lock:
+                    self._claimed.discard(entry_id)
+
+    def _flush(self, client, entry_id):
+        data_path, meta_path = self._paths(entry_id)
+        try:
+            with open(meta_path, 'rb') as f:
+                entry = json.loads(f.read())
+        except FileNotFoundError:
+            return
+
+        try:
+            if not entry['uploaded']:
+                with open(data_path, 'rb') as f:
+                    client.put_object(
+                        Bucket=entry['bucket'],
+                        Key=entry['key'],
+                        Body=f,
+                        Metadata=entry['metadata']
+                    )
+                entry['uploaded'] = True
+                _write_durably(meta_path, lambda f: f.write(json.dumps(entry).encode('utf-8')))
+            if entry['action']:
+                self.actions[entry['action']](**entry['action_args'])
+        except Exception as e:
+            self._retry_later(entry, meta_path, data_path, e)
+            return
+
+        os.remove(meta_path)
+        os.remove(data_path)
+        with self._lock:
+            self._bytes -= entry['size']
+
+    def _retry_later(self, entry, meta_path, data_path, error):
+        entry['attempts'] += 1
+        entry['last_error'] = str(error)
+        if entry['attempts'] >= self.max_attempts:
+            logger.error('Giving up on spooled upload %s after %d attempts: %s',
+                         entry['id'], entry['attempts'], error)
+            failed_data, failed_meta = self._paths(entry['id'], self.failed_directory)
+            os.replace(data_path, failed_data)
+            _write_durably(failed_meta, lambda f: f.write(json.dumps(entry).encode('utf-8')))
+            os.remove(meta_path)
+            return
+
+        delay = min(self.max_delay, self.base_delay * 2 ** (entry['attempts'] - 1))
+        entry['next_attempt'] = time.time() + delay
+        logger.warning('Spooled upload %s failed (attempt %d), retrying in %.1fs: %s',
+                       entry['id'], entry['attempts'], delay, error)
+        _write_durably(meta_path, lambda f: f.write(json.dumps(entry).encode('utf-8')))
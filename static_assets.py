@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+"""
+Static asset pipeline for the web UIs
+
+Pages and files under static/ are rendered, fingerprinted and precompressed
+once at startup, then served from memory with ETags and Cache-Control.
+"""
+
+import gzip
+import hashlib
+import mimetypes
+import os
+
+from flask import Response, abort, request
+
+try:
+    import brotli
+except ImportError:  # brotli is optional; gzip is always available
+    brotli = None
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+STATIC_DIR = os.path.join(BASE_DIR, 'static')
+
+# Fingerprinted URLs never change content, pages must be revalidated
+IMMUTABLE = 'public, max-age=31536000, immutable'
+REVALIDATE = 'no-cache'
+
+# Bodies smaller than this are not worth compressing
+MIN_COMPRESS_SIZE = 512
+
+
+class Asset:
+    """A single in-memory response body with its precompressed variants"""
+
+    def __init__(self, body, content_type, cache_control):
+        if isinstance(body, str):
+            body = body.encode('utf-8')
+        self.content_type = content_type
+        self.cache_control = cache_control
+        self.digest = hashlib.sha256(body).hexdigest()
+        self.variants = {'identity': body}
+
+        if len(body) >= MIN_COMPRESS_SIZE:
+            gzipped = gzip.compress(body, compresslevel=9, mtime=0)
+            if len(gzipped) < len(body):
+                self.variants['gzip'] = gzipped
+            if brotli is not None:
+                compressed = brotli.compress(body, quality=11)
+                if len(compressed) < len(body):
+                    self.variants['br'] = compressed
+
+    def etag(self, encoding):
+        """Strong ETag for one encoded representation"""
+        if encoding == 'identity':
+            return self.digest[:32]
+        return f"{self.digest[:32]}-{encoding}"
+
+    def pick_encoding(self):
+        """Choose the smallest variant the client accepts"""
+        encodings = [e for e in ('br', 'gzip') if e in self.variants]
+        if not encodings:
+            return 'identity'
+        return request.accept_encodings.best_match(encodings, default='identity')
+
+    def response(self):
+        """Build a response for the current request, honouring If-None-Match"""
+        encoding = self.pick_encoding()
+        etag = self.etag(encoding)
+
+        if request.if_none_match.contains_weak(etag):
+            response = Response(status=304)
+        else:
+            response = Response(self.variants[encoding], content_type=self.content_type)
+            if encoding != 'identity':
+                response.headers['Content-Encoding'] = encoding
+
+        response.set_etag(etag)
+        response.headers['Cache-Control'] = self.cache_control
+        if len(self.variants) > 1:
+            response.headers['Vary'] = 'Accept-Encoding'
+        return response
+
+
+class StaticAssets:
+    """Fingerprinted static files plus prerendered pages for a Flask app"""
+
+    def __init__(self, app=None, static_dir=STATIC_DIR, url_prefix='/assets'):
+        self.static_dir = static_dir
+        self.url_prefix = url_prefix.rstrip('/')
+        self.manifest = {}  # logical path -> fingerprinted path
+        self.files = {}  # fingerprinted path -> Asset
+        self.app = None
+        self.build()
+        if app is not None:
+            self.init_app(app)
+
+    def build(self):
+        """Fingerprint and precompress every file under the static directory"""
+        self.manifest.clear()
+        self.files.clear()
+        if not os.path.isdir(self.static_dir):
+            return
+
+        for root, _, names in os.walk(self.static_dir):
+            for name in sorted(names):
+                path = os.path.join(root, name)
+                logical = os.path.relpath(path, self.static_dir).replace(os.sep, '/')
+                with open(path, 'rb') as f:
+                    body = f.read()
+
+                content_type = mimetypes.guess_type(name)[0] or 'application/octet-stream'
+                if content_type.startswith('text/') or content_type == 'application/javascript':
+                    content_type += '; charset=utf-8'
+
+                asset = Asset(body, content_type, IMMUTABLE)
+                stem, ext = os.path.splitext(logical)
+                fingerprinted = f"{stem}.{asset.digest[:12]}{ext}"
+                self.manifest[logical] = fingerprinted
+                self.files[fingerprinted] = asset
+
+    def init_app(self, app):
+        self.app = app
+        app.jinja_env.globals['asset_url'] = self.url
+        app.add_url_rule(
+            f'{self.url_prefix}/<path:filename>',
+            endpoint='fingerprinted_asset',
+            view_func=self.serve
+        )
+
+    def url(self, logical):
+        """Fingerprinted URL for a file under static/"""
+        return f'{self.url_prefix}/{self.manifest[logical]}'
+
+    def serve(self, filename):
+        asset = self.files.get(filename)
+        if asset is None:
+            abort(404)
+        return asset.response()
+
+    def page(self, template_name, **context):
+        """Render a template once and keep it as a precompressed Asset"""
+        template = self.app.jinja_env.get_template(template_name)
+        html = template.render(**context)
+        return Asset(html, 'text/html; charset=utf-8', REVALIDATE)
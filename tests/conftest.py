@@ -0,0 +1,32 @@
+import importlib.util
+import os
+import sys
+
+import pytest
+
+# The modules under test live at the repository root
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+
+@pytest.fixture
+def load_app(monkeypatch, tmp_path):
+    """Import one of the hyphen-named app scripts with local state under tmp_path"""
+    from settings import settings
+
+    monkeypatch.setenv('DATA_DIR', str(tmp_path))
+    monkeypatch.setenv('AWS_ACCOUNT_ID', '123456789012')
+    monkeypatch.setenv('ENTITY_BACKEND', 'local')
+    settings.reset()
+
+    def load(filename):
+        name = filename[:-3].replace('-', '_')
+        spec = importlib.util.spec_from_file_location(name, os.path.join(ROOT, filename))
+        module = importlib.util.module_from_spec(spec)
+        monkeypatch.setitem(sys.modules, name, module)
+        spec.loader.exec_module(module)
+        return module
+
+    yield load
+    monkeypatch.undo()
+    settings.reset()
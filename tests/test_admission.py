@@ -0,0 +1,112 @@
+import io
+import threading
+import time
+
+import pytest
+
+from admission import UNKNOWN_TENANT, AdmissionController, Overloaded, parse_sources
+
+
+def test_unknown_sources_share_one_bulk_tenant():
+    admission = AdmissionController(sources={'web_ui': 'interactive', 'importer': 'bulk'})
+    assert admission.classify('made-up-1', 'interactive') == (UNKNOWN_TENANT, 'bulk')
+    assert admission.classify('made-up-2', None) == (UNKNOWN_TENANT, 'bulk')
+    assert admission.classify('importer', 'interactive') == ('importer', 'bulk')
+    assert admission.classify('web_ui', None) == ('web_ui', 'interactive')
+    assert admission.classify('web_ui', 'bulk') == ('web_ui', 'bulk')
+
+
+def test_finish_tags_are_pruned_once_virtual_time_passes_them():
+    admission = AdmissionController(sources={})
+    for tenant in range(100):
+        with admission.admit(f'tenant-{tenant}', 'bulk'):
+            pass
+    assert len(admission._last_finish) <= 1
+
+
+def test_parse_sources():
+    assert parse_sources('web_ui=interactive, importer=bulk,cli') == {
+        'web_ui': 'interactive', 'importer': 'bulk', 'cli': 'bulk'
+    }
+    assert parse_sources('') is None
+
+
+def wait_until(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, 'timed out'
+        time.sleep(0.005)
+
+
+def test_interactive_is_dispatched_ahead_of_queued_bulk():
+    admission = AdmissionController(max_in_flight=1, sources={})
+    order = []
+
+    def request(name, tenant, priority):
+        with admission.admit(tenant, priority):
+            order.append(name)
+
+    holder = admission.admit('other', 'bulk')
+    holder.__enter__()
+    threads = []
+    for name, tenant, priority in [('bulk-1', 'importer', 'bulk'), ('bulk-2', 'importer', 'bulk'),
+                                   ('interactive', 'web_ui', 'interactive')]:
+        thread = threading.Thread(target=request, args=(name, tenant, priority))
+        thread.start()
+        threads.append(thread)
+        wait_until(lambda: admission.stats()['queued'] == len(threads))
+
+    holder.__exit__(None, None, None)
+    for thread in threads:
+        thread.join(5)
+
+    assert order == ['interactive', 'bulk-1', 'bulk-2']
+
+
+def test_full_backlog_is_rejected_with_retry_after():
+    admission = AdmissionController(max_in_flight=1, max_backlog=2, max_wait=5)
+    holder = admission.admit('web_ui', 'interactive')
+    holder.__enter__()
+
+    def waiting_request():
+        with admission.admit('web_ui', 'interactive'):
+            pass
+
+    waiter = threading.Thread(target=waiting_request)
+    waiter.start()
+    wait_until(lambda: admission.stats()['queued'] == 1)
+
+    with pytest.raises(Overloaded) as rejected:
+        with admission.admit('web_ui', 'interactive'):
+            pass
+    assert rejected.value.retry_after >= 1
+    assert 'Too many requests' in str(rejected.value)
+    holder.__exit__(None, None, None)
+    waiter.join(5)
+
+
+def test_wait_past_max_wait_is_rejected():
+    admission = AdmissionController(max_in_flight=1, max_wait=0.05)
+    with admission.admit('web_ui', 'interactive'):
+        started = time.monotonic()
+        with pytest.raises(Overloaded) as rejected:
+            with admission.admit('web_ui', 'interactive'):
+                pass
+        assert time.monotonic() - started >= 0.05
+    assert rejected.value.retry_after >= 1
+    assert admission.stats()['queued'] == 0
+
+
+def test_upload_returns_429_with_retry_after(load_app, monkeypatch):
+    app_module = load_app('app.py')
+    admission = AdmissionController(max_in_flight=1, max_backlog=1)
+    monkeypatch.setattr(app_module, 'admission', admission)
+
+    with admission.admit('web_ui', 'interactive'):
+        response = app_module.app.test_client().post(
+            '/upload', data={'file': (io.BytesIO(b'data'), 'scan.pdf')}
+        )
+
+    assert response.status_code == 429
+    assert int(response.headers['Retry-After']) >= 1
+    assert response.get_json()['retry_after'] == int(response.headers['Retry-After'])
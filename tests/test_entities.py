@@ -0,0 +1,85 @@
+import math
+
+from entities import MAX_SEGMENT_BYTES, LocalEntityClient, extract_entities, split_segments
+
+
+def utf8_len(text):
+    return len(text.encode('utf-8'))
+
+
+def invoice_text(sentences):
+    return ' '.join(
+        f'Rechnung {i} von Müller GmbH über €{i},50 am 2024-01-{i % 28 + 1:02d} — fällig.'
+        for i in range(sentences)
+    )
+
+
+def test_segments_fit_the_byte_limit_and_cover_the_text():
+    text = invoice_text(400)
+    assert utf8_len(text) > 5 * MAX_SEGMENT_BYTES
+
+    segments = split_segments(text)
+
+    assert len(segments) > 1
+    assert all(utf8_len(segment) <= MAX_SEGMENT_BYTES for _, segment in segments)
+    assert ''.join(segment for _, segment in segments) == text
+    assert all(text[start:start + len(segment)] == segment for start, segment in segments)
+
+
+def test_oversized_sentence_is_split_within_the_limit():
+    # One sentence of multi-byte words with no sentence boundary in it
+    text = ' '.join(['größenüberschreitung'] * 600) + '.'
+    assert utf8_len(text) > MAX_SEGMENT_BYTES
+
+    segments = split_segments(text)
+
+    assert len(segments) > 1
+    assert all(utf8_len(segment) <= MAX_SEGMENT_BYTES for _, segment in segments)
+    assert ''.join(segment for _, segment in segments) == text
+
+    # Without whitespace the split falls on a character boundary
+    unbroken = 'ü' * 3000
+    pieces = split_segments(unbroken)
+    assert all(utf8_len(segment) <= MAX_SEGMENT_BYTES for _, segment in pieces)
+    assert ''.join(segment for _, segment in pieces) == unbroken
+
+
+def test_entity_offsets_map_back_onto_the_full_text():
+    text = invoice_text(400)
+    client = LocalEntityClient()
+
+    entities, errors = extract_entities(text, client)
+
+    assert errors == []
+    assert len(entities) >= 3 * 400
+    assert all(text[e['BeginOffset']:e['EndOffset']] == e['Text'] for e in entities)
+    assert entities == sorted(entities, key=lambda e: (e['BeginOffset'], e['EndOffset']))
+    # Entities from the last segment prove the offsets were shifted
+    assert entities[-1]['BeginOffset'] > MAX_SEGMENT_BYTES
+
+
+def test_more_than_25_segments_are_sent_in_several_batches():
+    text = invoice_text(200)
+    client = LocalEntityClient(max_bytes=200)
+    segments = split_segments(text, max_bytes=200)
+    assert len(segments) > 25
+
+    entities, errors = extract_entities(text, client, max_bytes=200)
+
+    assert errors == []
+    assert client.calls == math.ceil(len(segments) / 25)
+    assert all(text[e['BeginOffset']:e['EndOffset']] == e['Text'] for e in entities)
+
+
+def test_error_list_is_returned_with_segment_offsets():
+    text = invoice_text(60)
+    # The stand-in rejects segments the caller allows, as Comprehend would
+    client = LocalEntityClient(max_bytes=300)
+
+    entities, errors = extract_entities(text, client, max_bytes=1000)
+
+    segments = dict(split_segments(text, max_bytes=1000))
+    assert errors
+    assert all(e['error_code'] == 'TextSizeLimitExceededException' for e in errors)
+    assert all(utf8_len(segments[e['offset']]) > 300 for e in errors)
+    assert all(text[e['BeginOffset']:e['EndOffset']] == e['Text'] for e in entities)
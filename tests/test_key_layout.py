@@ -0,0 +1,32 @@
+from key_layout import ManifestIndex, object_key, shard_for
+
+
+def test_manifest_is_opened_on_first_use(tmp_path):
+    path = tmp_path / 'state' / 'manifest.db'
+    manifest = ManifestIndex(str(path))
+    assert not path.exists()
+
+    manifest.record('doc', 'bucket', object_key('doc', 'a b.pdf'), 3, 'abc', 'a b.pdf')
+    assert path.exists()
+    assert manifest.get('doc')['s3_key'] == f'{shard_for("doc")}/doc/a_b.pdf'
+    assert [entry['document_id'] for entry in manifest.list_recent(limit=1)] == ['doc']
+    manifest.close()
+
+
+def test_paging_does_not_skip_documents_sharing_a_timestamp(tmp_path):
+    manifest = ManifestIndex(str(tmp_path / 'manifest.db'))
+    for i in range(7):
+        # Concurrent uploads: several documents per timestamp
+        manifest.record(f'doc-{i}', 'bucket', f'key-{i}', 1, 'hash',
+                        uploaded_at=f'2024-01-01T00:00:0{i // 3}')
+
+    seen = []
+    page = manifest.list_recent(limit=2)
+    while page:
+        seen.extend(entry['document_id'] for entry in page)
+        last = page[-1]
+        page = manifest.list_recent(limit=2, before=last['uploaded_at'], before_id=last['document_id'])
+
+    assert sorted(seen) == [f'doc-{i}' for i in range(7)]
+    assert len(seen) == len(set(seen))
+    manifest.close()
@@ -0,0 +1,87 @@
+from layout import analyze_layout, stored_regions, text_lines
+
+
+def line(text, left, top, width, height=0.015, page=1):
+    return {
+        'BlockType': 'LINE',
+        'Text': text,
+        'Page': page,
+        'Geometry': {'BoundingBox': {'Left': left, 'Top': top, 'Width': width, 'Height': height}}
+    }
+
+
+def two_columns(rows=6, top=0.2):
+    left = [line(f'L{i}', 0.05, top + i * 0.03, 0.4) for i in range(rows)]
+    right = [line(f'R{i}', 0.55, top + i * 0.03, 0.4) for i in range(rows)]
+    return left, right
+
+
+def test_two_columns_read_column_by_column():
+    left, right = two_columns()
+    result = analyze_layout(right + left)
+    assert result['lines'] == [b['Text'] for b in left + right]
+    assert [r['column'] for r in result['regions']] == [0, 1]
+
+
+def test_centred_heading_does_not_close_the_gutter():
+    left, right = two_columns()
+    heading = line('Heading', 0.35, 0.1, 0.3)
+    result = analyze_layout([heading] + right + left)
+    assert result['lines'] == ['Heading'] + [b['Text'] for b in left + right]
+
+
+def test_heading_between_column_sections():
+    top_left, top_right = two_columns(rows=4, top=0.1)
+    bottom_left, bottom_right = two_columns(rows=4, top=0.4)
+    heading = line('Section 2', 0.35, 0.3, 0.3)
+    blocks = top_right + bottom_right + top_left + bottom_left + [heading]
+    result = analyze_layout(blocks)
+    expected = top_left + top_right + [heading] + bottom_left + bottom_right
+    assert result['lines'] == [b['Text'] for b in expected]
+
+
+def test_form_label_value_pairs_read_row_by_row():
+    fields = [('Name:', 'John Smith'), ('Date:', '2020-01-01'), ('Account:', '12345'),
+              ('Amount:', '$100.00'), ('Status:', 'Paid')]
+    blocks = []
+    for i, (label, value) in enumerate(fields):
+        blocks.append(line(value, 0.2, 0.1 + i * 0.03, 0.1))
+        blocks.append(line(label, 0.05, 0.1 + i * 0.03, 0.07))
+    result = analyze_layout(blocks)
+    assert result['lines'] == [text for pair in fields for text in pair]
+    assert len(result['regions']) == 1
+
+
+def test_table_columns_read_row_by_row():
+    rows = [('Item', 'Qty', 'Price'), ('Widget', '2', '$4.00'),
+            ('Gadget', '1', '$9.50'), ('Gizmo', '5', '$1.25')]
+    blocks = []
+    for i, cells in enumerate(rows):
+        for cell, left in zip(reversed(cells), (0.7, 0.45, 0.1)):
+            blocks.append(line(cell, left, 0.3 + i * 0.03, 0.08))
+    result = analyze_layout(blocks)
+    assert result['lines'] == [cell for row in rows for cell in row]
+
+
+def test_pages_are_ordered_independently():
+    left, right = two_columns(rows=3)
+    second = [dict(b, Page=2) for b in right + left]
+    result = analyze_layout(second + right + left)
+    page_one = [b['Text'] for b in left + right]
+    assert result['lines'] == page_one + page_one
+    assert result['page_count'] == 2
+
+
+def test_stored_regions_rebuild_from_the_text():
+    left, right = two_columns()
+    heading = line('Heading', 0.35, 0.1, 0.3)
+    result = analyze_layout([heading] + right + left)
+
+    stored = stored_regions(result['regions'])
+    lines = text_lines(result['text'])
+
+    assert lines == result['lines']
+    assert all('text' not in region for region in stored)
+    for region, original in zip(stored, result['regions']):
+        start, end = region['line_range']
+        assert '\n'.join(lines[start:end]) == original['text']
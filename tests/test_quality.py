@@ -0,0 +1,109 @@
+import pytest
+
+import quality
+from quality import PageReprocessor, low_confidence_pages, page_confidences, reprocess_low_confidence
+from settings import settings
+
+
+def page(number):
+    return {'BlockType': 'PAGE', 'Page': number}
+
+
+def word(text, confidence, number):
+    return {'BlockType': 'WORD', 'Text': text, 'Confidence': confidence, 'Page': number}
+
+
+def test_page_without_words_scores_zero_and_is_rerun_first():
+    blocks = [page(1), word('fine', 99.0, 1), page(2), page(3), word('blurry', 60.0, 3)]
+    assert page_confidences(blocks) == {1: 99.0, 2: 0.0, 3: 60.0}
+    assert low_confidence_pages(blocks, threshold=80) == [2, 3]
+
+
+def test_rerun_is_spliced_only_when_it_improves(monkeypatch):
+    blocks = [page(1), word('fine', 99.0, 1), page(2), word('blurry', 50.0, 2)]
+    monkeypatch.setenv('OCR_CONFIDENCE_THRESHOLD', '70')
+    settings.reset()
+    try:
+        reruns = {2: ([page(1), word('clear', 95.0, 1)], 'test')}
+        result, report = reprocess_low_confidence(blocks, reruns.get)
+    finally:
+        monkeypatch.undo()
+        settings.reset()
+
+    assert [b['Text'] for b in result if b['BlockType'] == 'WORD'] == ['fine', 'clear']
+    assert page_confidences(result) == {1: 99.0, 2: 95.0}
+    assert report == [{'page': 2, 'before': 50.0, 'after': 95.0, 'strategy': 'test', 'accepted': True}]
+
+
+def test_rerun_that_does_not_improve_keeps_original_blocks():
+    blocks = [page(1), word('blurry', 50.0, 1), page(2), word('smudged', 40.0, 2)]
+    reruns = {
+        1: ([page(1), word('worse', 30.0, 1)], 'test'),
+        2: ([page(1), word('same', 40.0, 1)], 'test'),
+    }
+    result, report = reprocess_low_confidence(blocks, reruns.get, threshold=80)
+
+    assert result == blocks
+    assert [(r['page'], r['after'], r['accepted']) for r in report] == [(2, 40.0, False), (1, 30.0, False)]
+
+
+def test_rerun_failures_are_reported_and_keep_original_blocks():
+    blocks = [page(1), word('blurry', 50.0, 1), page(2), word('smudged', 40.0, 2)]
+
+    def rerun(number):
+        if number == 2:
+            raise RuntimeError('AnalyzeDocument throttled')
+        return None
+
+    result, report = reprocess_low_confidence(blocks, rerun, threshold=80)
+
+    assert result == blocks
+    assert report == [
+        {'page': 2, 'before': 40.0, 'after': None, 'strategy': None, 'accepted': False,
+         'error': 'AnalyzeDocument throttled'},
+        {'page': 1, 'before': 50.0, 'after': None, 'strategy': None, 'accepted': False},
+    ]
+
+
+class RecordingTextract:
+    def __init__(self):
+        self.documents = []
+
+    def analyze_document(self, Document, FeatureTypes):
+        assert FeatureTypes == ['TABLES', 'FORMS']
+        self.documents.append(Document)
+        return {'Blocks': [word('rerun', 95.0, 1)]}
+
+
+S3_DOCUMENT = {'S3Object': {'Bucket': 'bucket', 'Name': 'ab/doc/scan'}}
+
+
+@pytest.mark.parametrize('filename, page_count, content, enhanced, pdf_page, strategy, document', [
+    # Images go through preprocessing when Pillow is available ...
+    ('scan.png', 1, b'png', b'enhanced', None, 'enhanced_image+analyze_document', {'Bytes': b'enhanced'}),
+    # ... and straight from S3 when it is not
+    ('scan.png', 1, b'png', None, None, 'analyze_document', S3_DOCUMENT),
+    # Single pages of a multi-page PDF are split out with pypdf
+    ('scan.pdf', 3, b'pdf', None, b'page', 'pdf_page+analyze_document', {'Bytes': b'page'}),
+    # Without pypdf a page of a multi-page PDF cannot be re-run on its own
+    ('scan.pdf', 3, b'pdf', None, None, None, None),
+    # Single-page documents without bytes are re-run from S3
+    ('scan.pdf', 1, None, None, None, 'analyze_document', S3_DOCUMENT),
+    ('scan.tiff', 2, None, None, None, None, None),
+])
+def test_page_reprocessor_strategy(monkeypatch, filename, page_count, content,
+                                   enhanced, pdf_page, strategy, document):
+    monkeypatch.setattr(quality, 'enhance_image', lambda data: enhanced)
+    monkeypatch.setattr(quality, 'extract_pdf_page', lambda data, number: pdf_page)
+    textract = RecordingTextract()
+    reprocessor = PageReprocessor(textract, 'bucket', 'ab/doc/scan', content=content,
+                                  filename=filename, page_count=page_count)
+
+    result = reprocessor(2 if page_count > 1 else 1)
+
+    if strategy is None:
+        assert result is None
+        assert textract.documents == []
+    else:
+        assert result[1] == strategy
+        assert textract.documents == [document]
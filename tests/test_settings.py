@@ -0,0 +1,37 @@
+import threading
+
+from settings import Settings
+
+
+def test_clients_are_shared_and_resources_are_per_thread():
+    settings = Settings({'AWS_REGION': 'us-west-2'})
+    client = settings.client('s3')
+    resource = settings.resource('dynamodb')
+    assert settings.client('s3') is client
+    assert settings.resource('dynamodb') is resource
+
+    session = settings._session
+    seen = {}
+
+    def worker():
+        seen['client'] = settings.client('s3')
+        seen['resource'] = settings.resource('dynamodb')
+
+    thread = threading.Thread(target=worker)
+    thread.start()
+    thread.join()
+    assert seen['client'] is client
+    assert seen['resource'] is not resource
+    # New threads build their resource from the existing session
+    assert settings._session is session
+    assert seen['resource'].meta.client.meta.region_name == 'us-west-2'
+
+
+def test_environment_overrides_and_reset():
+    environ = {'ENVIRONMENT': 'prod', 'AWS_ACCOUNT_ID': '123', 'DATA_DIR': '/data'}
+    settings = Settings(environ)
+    assert settings.raw_bucket == 'aws-idp-system-documents-raw-123-prod'
+    assert settings.manifest_path == '/data/manifest.db'
+    environ['RAW_BUCKET'] = 'override'
+    settings.reset()
+    assert settings.raw_bucket == 'override'
@@ -0,0 +1,76 @@
+import errno
+import io
+import threading
+import time
+
+from spool import UploadSpool
+
+
+class FlakyS3:
+    """put_object fails for keys in fail_once the first time they are sent"""
+
+    def __init__(self, fail_once=()):
+        self.fail_once = set(fail_once)
+        self.stored = {}
+        self.lock = threading.Lock()
+
+    def put_object(self, Bucket, Key, Body, Metadata):
+        with self.lock:
+            if Key in self.fail_once:
+                self.fail_once.discard(Key)
+                raise RuntimeError('S3 unavailable')
+            self.stored[Key] = Body.read()
+
+
+def wait_for(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if condition():
+            return True
+        time.sleep(0.02)
+    return False
+
+
+def test_flusher_survives_failure_in_retry_path(tmp_path):
+    s3 = FlakyS3(fail_once={'first'})
+    spool = UploadSpool(str(tmp_path), lambda: s3, flushers=1,
+                        base_delay=0.01, rescan_interval=0.05)
+    original = spool._retry_later
+    failures = []
+
+    def retry_later_disk_full(*args):
+        if not failures:
+            failures.append(True)
+            raise OSError(errno.ENOSPC, 'No space left on device')
+        return original(*args)
+
+    spool._retry_later = retry_later_disk_full
+    try:
+        spool.put('first', io.BytesIO(b'one'), 'bucket', 'first')
+        assert wait_for(lambda: failures)
+
+        spool.put('second', io.BytesIO(b'two'), 'bucket', 'second')
+        assert wait_for(lambda: 'second' in s3.stored and 'first' in s3.stored)
+        assert all(thread.is_alive() for thread in spool._threads)
+        assert wait_for(lambda: spool.stats()['bytes'] == 0)
+    finally:
+        spool.stop(timeout=2)
+
+
+def test_flusher_survives_client_factory_failure(tmp_path):
+    s3 = FlakyS3()
+    calls = []
+
+    def client_factory():
+        calls.append(True)
+        if len(calls) == 1:
+            raise RuntimeError('no credentials yet')
+        return s3
+
+    spool = UploadSpool(str(tmp_path), client_factory, flushers=1,
+                        base_delay=0.01, rescan_interval=0.05)
+    try:
+        spool.put('entry', io.BytesIO(b'data'), 'bucket', 'entry')
+        assert wait_for(lambda: 'entry' in s3.stored)
+    finally:
+        spool.stop(timeout=2)
@@ -0,0 +1,117 @@
+import io
+
+import boto3
+import pytest
+from botocore.stub import ANY, Stubber
+
+
+def bounding_box(top):
+    return {'BoundingBox': {'Width': 0.3, 'Height': 0.02, 'Left': 0.1, 'Top': top}}
+
+
+def ocr_blocks(confidence):
+    return [
+        {'BlockType': 'PAGE', 'Id': 'page', 'Geometry': bounding_box(0.0)},
+        {'BlockType': 'LINE', 'Id': 'line', 'Text': 'Invoice 42', 'Confidence': confidence,
+         'Geometry': bounding_box(0.1)},
+        {'BlockType': 'WORD', 'Id': 'w1', 'Text': 'Invoice', 'Confidence': confidence,
+         'Geometry': bounding_box(0.1)},
+        {'BlockType': 'WORD', 'Id': 'w2', 'Text': '42', 'Confidence': confidence,
+         'Geometry': bounding_box(0.1)},
+    ]
+
+
+def stubbed_client(service):
+    client = boto3.client(service, region_name='us-east-1',
+                          aws_access_key_id='test', aws_secret_access_key='test')
+    return client, Stubber(client)
+
+
+class FakeTable:
+    def __init__(self):
+        self.items = []
+
+    def put_item(self, Item):
+        self.items.append(Item)
+
+
+class FakeDynamoDB:
+    def __init__(self):
+        self.table = FakeTable()
+
+    def Table(self, name):
+        return self.table
+
+
+@pytest.mark.parametrize('filename', ['modern-app.py', 'simple-app.py'])
+def test_upload_reruns_low_confidence_page_after_s3_upload(load_app, monkeypatch, filename):
+    app_module = load_app(filename)
+    bucket = 'aws-idp-raw-123456789012-dev'
+
+    s3, s3_stub = stubbed_client('s3')
+    s3_stub.add_response('put_object', {}, {'Bucket': bucket, 'Key': ANY, 'Body': ANY})
+    textract, textract_stub = stubbed_client('textract')
+    textract_stub.add_response('detect_document_text', {'Blocks': ocr_blocks(40.0)})
+    textract_stub.add_response(
+        'analyze_document', {'Blocks': ocr_blocks(97.0)},
+        {'Document': {'S3Object': {'Bucket': bucket, 'Name': ANY}}, 'FeatureTypes': ['TABLES', 'FORMS']}
+    )
+    dynamodb = FakeDynamoDB()
+    clients = {'s3': s3, 'textract': textract}
+    monkeypatch.setattr(app_module.settings, 'client', lambda name, **kwargs: clients[name])
+    monkeypatch.setattr(app_module.settings, 'resource', lambda name, **kwargs: dynamodb)
+
+    with s3_stub, textract_stub:
+        response = app_module.app.test_client().post(
+            '/upload', data={'file': (io.BytesIO(b'%PDF-1.4 scanned page'), 'scan.pdf')}
+        )
+        s3_stub.assert_no_pending_responses()
+        textract_stub.assert_no_pending_responses()
+
+    result = response.get_json()
+    assert result['status'] == 'success'
+    assert result['reprocessed_pages'] == [{
+        'page': 1, 'before': 40.0, 'after': 97.0, 'strategy': 'analyze_document', 'accepted': True
+    }]
+    assert result['page_confidence'] == {'1': 97.0}
+    item = dynamodb.table.items[0]
+    assert item['extracted_text'] == 'Invoice 42'
+    # The text is stored once, regions keep geometry and line ranges
+    assert [region['line_range'] for region in item['regions']] == [[0, 1]]
+    assert all('text' not in region for region in item['regions'])
+
+
+class FailingComprehend:
+    def batch_detect_entities(self, TextList, LanguageCode):
+        raise RuntimeError('AccessDeniedException: comprehend:BatchDetectEntities')
+
+
+@pytest.mark.parametrize('filename', ['modern-app.py', 'simple-app.py'])
+def test_upload_stores_document_when_entity_extraction_fails(load_app, monkeypatch, filename):
+    app_module = load_app(filename)
+
+    s3, s3_stub = stubbed_client('s3')
+    s3_stub.add_response('put_object', {})
+    textract, textract_stub = stubbed_client('textract')
+    textract_stub.add_response('detect_document_text', {'Blocks': ocr_blocks(99.0)})
+    dynamodb = FakeDynamoDB()
+    clients = {'s3': s3, 'textract': textract}
+    monkeypatch.setattr(app_module.settings, 'client', lambda name, **kwargs: clients[name])
+    monkeypatch.setattr(app_module.settings, 'resource', lambda name, **kwargs: dynamodb)
+    monkeypatch.setattr(app_module, 'get_entity_client', FailingComprehend)
+
+    with s3_stub, textract_stub:
+        response = app_module.app.test_client().post(
+            '/upload', data={'file': (io.BytesIO(b'%PDF-1.4 page'), 'page.pdf')}
+        )
+
+    result = response.get_json()
+    assert result['status'] == 'success'
+    assert result['entities'] == []
+    item = dynamodb.table.items[0]
+    assert item['extracted_text'] == 'Invoice 42'
+    assert item['entities'] == []
+    assert item['entity_errors'] == [{
+        'offset': 0, 'error_code': 'RuntimeError',
+        'message': 'AccessDeniedException: comprehend:BatchDetectEntities'
+    }]